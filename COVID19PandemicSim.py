@@ -5,9 +5,19 @@
 # Also can perform a parameter study with the parameter study function
 # Each person also moves in a way that simulates social distancing
 
-import tkinter
-import random
-import matplotlib.pyplot as plt
+import math
+import time
+import os
+import sys
+import itertools
+import json
+import zlib
+import zipfile
+import struct
+import collections
+import queue
+import tracemalloc
+import numpy as np
 WIDTH = 40                  # How many cells wide the region is
 HEIGHT = 30                 # How many cells tall the region is
                             # Note that going larger makes each day take longer.
@@ -20,6 +30,17 @@ SCREEN_UPDATE_FREQUENCY = 1 # How often to redraw the screen.  Making this 5 or
                             # will cause the screen to redraw only every 5 or 10
                             # days, speeding up the run-time, slightly.
 
+RENDER_MODE = "dirty"       # How the window draws the grid.  "dirty" uses a
+                            # rectangle per cell and only repaints the ones
+                            # that changed; "image" draws the whole grid as
+                            # one picture, which is much faster for big grids.
+                            # The window title shows the time per frame.
+FRAME_RATE = 30             # How many times a second the window redraws when
+                            # the simulation runs in the background
+BACKGROUND = True           # Run the visual mode's simulation in its own
+                            # process (see BackgroundRun), so the window
+                            # stays responsive however big the grid is
+
 STARTING_INFECTED = 4       # How many "patient zero"s are there in your population?
 
 POPULATION_DENSITY = .9    # Fraction of cells have a person in them
@@ -33,21 +54,246 @@ INFECTION_LENGTH = 6       # How many days the infection lasts
 
 CONTAGION_FACTOR = .2       # If you come into contact with someone who is contagious,
                             # how likely are you to get it?
+
+ENGINE = "object"           # Which simulation engine createRegion() builds.
+                            # "object" is the original grid of Person objects,
+                            # "vector" stores the grid as NumPy arrays and
+                            # updates everyone at once, which is much faster
+                            # for big regions (millions of cells); its
+                            # averages match "object" to within the noise of
+                            # 150 runs (see VectorRegion.order_groups).
+                            # "tiled" is "vector" split between several
+                            # processes (see WORKERS), for the biggest ones.
+                            # "ensemble" is "vector", but sweeps run many
+                            # replicas together (see EnsembleRegion).
+                            # "chunked" is "vector" with the grid kept on
+                            # disk, for regions too big for memory; use it
+                            # with FRONTIER on (see ChunkedRegion).
+WORKERS = None              # How many processes the "tiled" engine splits
+                            # the grid between (None for one per CPU)
+FRONTIER = False            # Only roll for catching it around the outbreak
+                            # each day.  Everybody still moves, and the
+                            # results are the same as with it off, but it's
+                            # faster for big regions where the outbreak is
+                            # small.
+
+# Integer codes for what is in a cell.  The NumPy engine stores one of these
+# per cell instead of a Person object or None, and Person.state is one of
+# them too.  WALL is only
+# used for the one cell border around the grid, so that looking at a
+# neighbor never falls off the edge of the array.
+EMPTY = 0
+SUSCEPTIBLE = 1
+INFECTED = 2
+SYMPTOMATIC = 3
+RECOVERED = 4
+DEAD = 5
+WALL = 6
+
+# The dict_count key and screen color for each code above
+STATE_NAMES = ["empty", "susceptable", "infected", "symptomatic", "recovered", "dead"]
+STATE_COLORS = ["black", "white", "red", "brown", "green", "yellow"]
+STATE_HEX_COLORS = ["#000000", "#ffffff", "#ff0000", "#a52a2a", "#00ff00", "#ffff00"]
+STATE_CODES = {name: code for code, name in enumerate(STATE_NAMES)}
+
+# Whether somebody in each state can pass it on, and how many steps they
+# move around each day
+CONTAGIOUS = [False, False, True, True, False, False, False]
+STEPS = [0, 5, 5, 1, 5, 0, 0]
+
+# What a Region reports about each day (see BaseRegion.step): the tallies of
+# people in each state, how many were newly infected and how many died that
+# day, and the highest number of symptomatic people at once so far and the
+# day that happened.
+DayStats = collections.namedtuple("DayStats", ["day", "susceptible", "infected", "symptomatic",
+                                               "recovered", "dead", "new_infections", "new_deaths",
+                                               "peak_symptomatic", "peak_day"])
+
+# The eight (row, col) steps to the cells around a person
+NEIGHBOR_OFFSETS = [(-1, -1), (-1, 0), (-1, 1), (0, -1), (0, 1), (1, -1), (1, 0), (1, 1)]
+
+# Person.update rolls once for every contagious person it counts at each
+# distance from 0 to 3, with the chance cut in half for each step further out.
+# Somebody 1 step away is counted at distances 1, 2 and 3, somebody 2 steps
+# away at 2 and 3, and so on.  The chance of dodging all of those rolls
+# multiplies out, so its log is just a sum: each contagious person adds their
+# share from this 7 x 7 table, depending on how far away they are.
+def pressure_kernel(contagion_factor):
+    logs = [0.0]
+    contagion_chance = contagion_factor
+    for distance in range(1, 4):
+        contagion_chance = contagion_chance / 2
+        logs.append(math.log1p(-contagion_chance))
+    kernel = np.zeros((7, 7))
+    for dr in range(-3, 4):
+        for dc in range(-3, 4):
+            distance = max(abs(dr), abs(dc))
+            if distance > 0:
+                kernel[dr + 3, dc + 3] = sum(logs[distance:])
+    return kernel
+
+# The log of the chance of dodging everybody contagious nearby, for every cell
+# of the grid at once.  contagious is a boolean grid.  Rather than counting the
+# (2d+1) x (2d+1) square around each cell for each distance d, the counts come
+# from a summed-area table (each entry is the total of everything above and to
+# the left of it), so any square costs four lookups no matter how big it is.
+# The result has a 3 cell border of zeros, so that spread-style updates
+# (adding pressure_kernel() around one cell) never fall off the edge.
+# For a stack of grids (see EnsembleRegion), contagion_factor can be an
+# array that lines up with the leading axes.
+def infection_pressure(contagious, contagion_factor):
+    height = contagious.shape[-2]
+    width = contagious.shape[-1]
+    pad = [(0, 0)] * (contagious.ndim - 2) + [(4, 3), (4, 3)]
+    table = np.pad(contagious, pad).astype(np.int32).cumsum(-2).cumsum(-1)
+    pressure = np.zeros(contagious.shape[:-2] + (height + 6, width + 6))
+    inner = pressure[..., 3:-3, 3:-3]
+    contagion_chance = np.asarray(contagion_factor, dtype=float)
+    for distance in range(1, 4):
+        contagion_chance = contagion_chance / 2
+        # (math.log1p rather than np.log1p, which can differ in the last
+        # bit, so that a stack of runs gives exactly the same as each run
+        # on its own.)
+        log_escape = np.vectorize(math.log1p)(-contagion_chance)
+        low = 3 - distance
+        high = 4 + distance
+        count = table[..., high:high + height, high:high + width] \
+            - table[..., low:low + height, high:high + width] \
+            - table[..., high:high + height, low:low + width] \
+            + table[..., low:low + height, low:low + width]
+        inner += (count - contagious) * log_escape
+    return pressure
+
+# What each random number is for (see keyedRandom).  MOVE and PRIORITY are
+# for the first of the 5 steps of movement; each step after that adds 1.
+PLACE = 0
+PATIENT_ZERO = 1
+ORDER = 2
+SYMPTOMS = 3
+DEATH = 4
+INFECTION = 5
+MOVE = 8
+PRIORITY = 16
+
+# Turns any seed (or None for a random one) into the 64-bit number that the
+# random numbers of a run are keyed by
+def runSeed(seed):
+    return np.random.SeedSequence(seed).entropy % 2**64
+
+# Counter-based random numbers.  Rather than taking the next number from a
+# generator, so that what you get depends on everything drawn before it,
+# every random number of a run is worked out from its key: the run's seed,
+# the day, what it's for (one of the purposes above) and which cell (or
+# person) it's for.  Philox can jump straight to any of them, so the count
+# numbers starting from number first are the same no matter which engine or
+# process asks for them, or in what order.  keyedBits gives the raw 64-bit
+# numbers, and keyedRandom turns them into floats between 0 and 1.
+def keyedBits(seed, day, purpose, first, count):
+    generator = np.random.Philox(key=(seed << 64) | (day << 8) | purpose, counter=first // 4)
+    return generator.random_raw(count + first % 4)[first % 4:]
+
+def keyedRandom(seed, day, purpose, first, count):
+    return (keyedBits(seed, day, purpose, first, count) >> np.uint64(11)) * 2.0 ** -53
+
+# The keyedRandom numbers of one day and purpose for some of a Region's
+# people, by person number, for when only some of them need one (see
+# Region.update_grid).  draw() works out the numbers of a lot of people in
+# one go; anybody else's is worked out on its own the first time it's
+# looked at, which is much slower.
+class KeyedDraws(dict):
+    # How far apart two people's numbers can be and still be drawn in one
+    # go, drawing everybody's in between.  Starting a draw costs about as
+    # much as drawing this many numbers.
+    gap = 512
+
+    def __init__(self, seed, day, purpose):
+        self.seed = seed
+        self.day = day
+        self.purpose = purpose
+
+    def __missing__(self, number):
+        value = float(keyedRandom(self.seed, self.day, self.purpose, number, 1)[0])
+        self[number] = value
+        return value
+
+    # Works out the numbers of everybody in numbers (a sorted array), a run
+    # of numbers that are close together at a time
+    def draw(self, numbers):
+        breaks = np.flatnonzero(np.diff(numbers) > self.gap) + 1
+        for run in np.split(numbers, breaks):
+            if len(run) == 0:
+                continue
+            first = int(run[0])
+            values = keyedRandom(self.seed, self.day, self.purpose, first, int(run[-1]) - first + 1)
+            self.update(zip(run.tolist(), values[run - first].tolist()))
+
+# Where the people and the "patient zero"s are on day 0, as a grid of state
+# codes.  Both engines start from this, so a seed gives the same starting
+# grid in either.
+def startingGrid(params, seed):
+    cells = params.height * params.width
+    people = keyedRandom(seed, 0, PLACE, 0, cells) < params.population_density
+    state = np.where(people, SUSCEPTIBLE, EMPTY).astype(np.int8)
+
+    # Start off with a handful a "patient zero"s: the people with the lowest
+    # numbers for PATIENT_ZERO.
+    where_people = np.flatnonzero(people)
+    luck = keyedRandom(seed, 0, PATIENT_ZERO, 0, cells)[where_people]
+    unlucky = where_people[np.argsort(luck, kind="stable")[:params.starting_infected]]
+    state[unlucky] = INFECTED
+    return state.reshape(params.height, params.width)
+
+# The settings of one simulation run, passed to a Region instead of having it
+# read the settings at the top of the file.  That way many runs with
+# different settings can happen side by side (or in other processes).
+# Anything not given is copied from the top of the file when it is made, e.g.
+# Parameters(population_density=.5).
+class Parameters:
+    names = ["width", "height", "starting_infected", "population_density",
+             "symptom_chance", "mortality_rate", "infection_length", "contagion_factor"]
+
+    def __init__(self, **settings):
+        for name in self.names:
+            setattr(self, name, settings.pop(name, globals()[name.upper()]))
+        if settings:
+            raise TypeError("Unknown parameters: " + ", ".join(sorted(settings)))
+
+    # A copy with some of the settings changed
+    def replace(self, **changes):
+        settings = self.as_dict()
+        settings.update(changes)
+        return Parameters(**settings)
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in self.names}
+
+    def __repr__(self):
+        return "Parameters({})".format(", ".join("{}={!r}".format(k, v) for k, v in self.as_dict().items()))
+
 class Person:
-    # There are five states a person can be in:
-    #   Susceptable:  They've never had it, and can get it
-    #   Infected:   They have it and are contagious, but don't know it
-    #   Symptomatic: They have it, and have symptoms, so they move around less
-    #   Recovered:  They're over it, no longer contagious, and can't get it again
-    #   Dead:  They died of the virus
-    
+    # There are five states a person can be in (the codes at the top of the
+    # file):
+    #   SUSCEPTIBLE:  They've never had it, and can get it
+    #   INFECTED:   They have it and are contagious, but don't know it
+    #   SYMPTOMATIC: They have it, and have symptoms, so they move around less
+    #   RECOVERED:  They're over it, no longer contagious, and can't get it again
+    #   DEAD:  They died of the virus
+
+    # There are a lot of people, so rather than each one having a __dict__,
+    # these are the only things a person stores.
+    __slots__ = ("state", "region", "my_row", "my_col", "days_left", "number")
+
     # Each person object needs to "know" (have stored) their region, and
-    # where in their region (row, column) they are located
-    def __init__(self, region, row, col):
-        self.state = "susceptable"
+    # where in their region (row, column) they are located.  number is
+    # which person they are in region.person_list, which is also which of
+    # the region's random numbers are theirs (see Region.update_grid).
+    def __init__(self, region, row, col, number):
+        self.state = SUSCEPTIBLE
         self.region = region
         self.my_row = row
         self.my_col = col
+        self.days_left = 0
+        self.number = number
     
     # How many neighbors within a certain distance are infected or symptomatic?
     # Rather than pythagorian distance, I'm just doing an n x n square from
@@ -59,93 +305,104 @@ class Person:
         for r in range(self.my_row - distance, self.my_row + distance + 1):
             for c in range(self.my_col - distance, self.my_col + distance + 1):
                 # Check if the neighbor I'm looking at is off the grid
-                if r < 0 or c < 0 or r >= HEIGHT or c >= WIDTH:
+                if r < 0 or c < 0 or r >= self.region.height or c >= self.region.width:
                     continue
                 # Check if the "neighbor" I'm looking at is actually me
                 if r == self.my_row and c == self.my_col:
                     continue
                 # Only check if that location in the grid is contagious if it's 
-                # not "empty". (Because, if it's the string "empty", it won't 
-                # have a .state variable to check, and trying would cause an 
-                # error.)
-                if self.region.grid[r][c] != "empty" \
-                        and self.region.grid[r][c].state in ["infected", "symptomatic"]:
+                # not empty. (Because, if it's None, it won't have a .state
+                # variable to check, and trying would cause an error.)
+                if self.region.grid[r][c] is not None \
+                        and CONTAGIOUS[self.region.grid[r][c].state]:
                     infected_neighbors += 1
         return infected_neighbors
         
         
     # This function gets called once per clock (day) for each person object
     def update(self):
+        params = self.region.params
+        draws = self.region.draws
         
         # Move around (How far? based on how healthy you feel.)
-        if self.state == "susceptable" or self.state == "infected"  or \
-                    self.state == "recovered":
-            # Healthy-feeling people move 5 "steps"
-            for i in range(5):
-                self.move()
-        elif self.state == "symptomatic":
-            # Sick-feeling people mostly stay home -- move 1 step
-            for i in range(1):
-                self.move()
+        # Healthy-feeling people move 5 "steps", sick-feeling people mostly
+        # stay home -- move 1 step (see STEPS)
+        for step in range(STEPS[self.state]):
+            self.move(step)
         
         # If you're sick, you're one day closer to getting better
-        if self.state == "infected" or self.state == "symptomatic":
+        if CONTAGIOUS[self.state]:
             self.days_left -= 1
             
             # If you're sick but have no days left to be sick, you're recovered.
             # Congratulations!
             if self.days_left <= 0:
-                self.state = "recovered"
+                self.become(RECOVERED)
 
         # If you're infected, you have a chance of developing symptoms
-        if self.state == "infected":
-            if random.random() < SYMPTOM_CHANCE:
-                self.state = "symptomatic"
+        if self.state == INFECTED:
+            if draws[SYMPTOMS][self.number] < params.symptom_chance:
+                self.become(SYMPTOMATIC)
                 
         # If you're symptomatic, you have a chance of dying.
-        if self.state == "symptomatic":
-            if random.random() < (MORTALITY_RATE / INFECTION_LENGTH):
-                self.state = "dead"
+        if self.state == SYMPTOMATIC:
+            if draws[DEATH][self.number] < (params.mortality_rate / params.infection_length):
+                self.become(DEAD)
             
-        # If you're susceptable, you have a chance of getting infected
-        if self.state == "susceptable":
+        # If you're susceptable, you have a chance of getting infected.  (With
+        # frontier on, nobody far from the outbreak rolls for it.)
+        if self.state == SUSCEPTIBLE and (not self.region.frontier or self.region.near_outbreak(self.my_row, self.my_col)):
             # x is how likely you are to get it from someone at a given distance.
             # We're assuming that the chance of getting it is cut in half with 
             # each additional step away.  That is, if you have a 30% chance of 
             # getting it if you're next to an infected person, you'll have a 15% 
             # chance of getting it for each infected person 2 steps away
             # and a 7.5% chance for each infected person 3 steps away, etc...
-            contagion_chance = CONTAGION_FACTOR
             # Calculating for up to 4 places out.  Kind of arbitrary how far to check.
-            for distance in range(4):
-                # count how many infected people are within a certain distance
-                num_infected_people = self.count_infected_neighbors(distance)
-                for i in range(num_infected_people):
-                    if random.random() < contagion_chance:
-                        self.state = "infected"
-                        self.days_left = INFECTION_LENGTH
-                        
-                # Divide chance of contagion by 2 for each step away from the
-                # nearest infected person
-                contagion_chance = contagion_chance / 2
+            # Rather than counting the infected people around me at each
+            # distance (count_infected_neighbors) and rolling for each one,
+            # the region keeps the chance of dodging all of them up to date
+            # for every cell (see pressure_kernel), so one roll will do.
+            escape = self.region.pressure[self.my_row + 3, self.my_col + 3]
+            if escape < 0 and draws[INFECTION][self.number] < -math.expm1(escape):
+                self.become(INFECTED)
+                self.days_left = params.infection_length
+
+    # Every change of state goes through here, so that the region can keep
+    # its tallies (and the infection pressure around me) up to date without
+    # having to look at everybody again.
+    def become(self, state):
+        region = self.region
+        region.tally[self.state] -= 1
+        region.tally[state] += 1
+        was_contagious = CONTAGIOUS[self.state]
+        is_contagious = CONTAGIOUS[state]
+        if was_contagious and not is_contagious:
+            region.spread(self.my_row, self.my_col, -1)
+            region.mark_outbreak(self.my_row, self.my_col, -1)
+            del region.contagious[self]
+        elif is_contagious and not was_contagious:
+            region.spread(self.my_row, self.my_col, 1)
+            region.mark_outbreak(self.my_row, self.my_col, 1)
+            region.contagious[self] = True
+        if state == INFECTED:
+            region.new_infections += 1
+        elif state == DEAD:
+            region.new_deaths += 1
+        self.state = state
+
     # Social distance function to replace the random move by the person. Checks each spot next to each person
-    # and returns the spot with the most empty neighbors.
-    def socialDistance(self, empty_neighbors):
+    # and returns the spot with the most empty neighbors.  The region keeps
+    # count of the empty neighbors of every cell (see Region.empty_count), so
+    # this doesn't have to look around each spot.  step is which of the day's
+    # steps this is.
+    def socialDistance(self, empty_neighbors, step):
+        empty_count = self.region.empty_count
+        stride = self.region.width + 2
         max_neighbors = 0
         best_spots = []
         for neighbor in empty_neighbors:
-            neighbor_count = 0
-            for r in range(neighbor[0] - 1, neighbor[0] + 2):
-                for c in range(neighbor[1] - 1, neighbor[1] + 2):
-                    # If the neighbor I'm looking at is off the grid, skip to the next one
-                    if r < 0 or c < 0 or r >= HEIGHT or c >= WIDTH:
-                        continue
-                    # If the "neighbor" I'm looking at is me, skip to the next one
-                    if r == neighbor[0] and c == neighbor[1]:
-                        continue
-                
-                    if self.region.grid[r][c] == "empty":
-                        neighbor_count += 1
+            neighbor_count = empty_count[(neighbor[0] + 1) * stride + neighbor[1] + 1]
                         
             #Section of code to simulate social distance
             if neighbor_count > max_neighbors:
@@ -153,272 +410,2709 @@ class Person:
                 best_spots = [neighbor]
             elif neighbor_count == max_neighbors:
                 best_spots.append(neighbor)
-        return random.choice(best_spots) #Move to a random one of the most empty spots
+        #Move to a random one of the most empty spots
+        return best_spots[int(self.region.draws[MOVE + step][self.number] * len(best_spots))]
     
-    def move(self):
-        # Make a list of all of the blank cells around me, then pick one to 
-        # move to (if any)
+    # Makes a list of all of the blank cells around me
+    def find_empty_neighbors(self):
+        grid = self.region.grid
+        height = self.region.height
+        width = self.region.width
         empty_neighbors = []
         for r in range(self.my_row - 1, self.my_row + 2):
             for c in range(self.my_col - 1, self.my_col + 2):
                 # If the neighbor I'm looking at is off the grid, skip to the next one
-                if r < 0 or c < 0 or r >= HEIGHT or c >= WIDTH:
+                if r < 0 or c < 0 or r >= height or c >= width:
                     continue
                 # If the "neighbor" I'm looking at is me, skip to the next one
                 if r == self.my_row and c == self.my_col:
                     continue
                 
-                if self.region.grid[r][c] == "empty":
+                if grid[r][c] is None:
                     empty_neighbors.append( (r,c) )
+        return empty_neighbors
+
+    def move(self, step):
+        # Make a list of all of the blank cells around me, then pick one to 
+        # move to (if any)
+        empty_neighbors = self.find_empty_neighbors()
         
         if len(empty_neighbors) > 0:
             
             # Pick an empty neighboring cell at random
-            new_row, new_col = self.socialDistance(empty_neighbors)
+            new_row, new_col = self.socialDistance(empty_neighbors, step)
         
             # To "move" there, replace my current spot in the grid with 
-            # "empty", and insert myself in the new, previously empty
+            # None, and insert myself in the new, previously empty
             # spot, then update my own record of where I am.
-            self.region.grid[self.my_row][self.my_col] = "empty"
-            self.region.grid[new_row][new_col] = self
+            region = self.region
+            region.grid[self.my_row][self.my_col] = None
+            region.grid[new_row][new_col] = self
+            region.update_empty_count(self.my_row, self.my_col, new_row, new_col)
+            if CONTAGIOUS[self.state]:
+                region.spread(self.my_row, self.my_col, -1)
+                region.spread(new_row, new_col, 1)
+                block = region.frontier_block
+                if self.my_row // block != new_row // block or self.my_col // block != new_col // block:
+                    region.mark_outbreak(self.my_row, self.my_col, -1)
+                    region.mark_outbreak(new_row, new_col, 1)
             self.my_row = new_row
             self.my_col = new_col
     
-class Region:
-    def __init__(self,runCanvas=True):
+# What both engines (Region and VectorRegion) have in common: the observers,
+# the tallies, and running a day at a time.  They each provide update_grid()
+# and state_grid(), and keep self.tally, self.new_infections and
+# self.new_deaths up to date as people change state.
+class BaseRegion:
+    # Filled in by step()
+    stats = None
+    peak_day = 0
+    new_infections = 0
+    new_deaths = 0
+
+    # With frontier on, the grid is split into square blocks of this many
+    # cells a side, and only the blocks with somebody contagious in them and
+    # the blocks next to those roll for catching it (see block_boxes).
+    frontier_block = 64
+
+    # How many people are in each state, keyed like STATE_NAMES.  This just
+    # reads the tallies, it doesn't look at the grid.
+    def count_states(self):
+        return {name: int(self.tally[code]) for code, name in enumerate(STATE_NAMES) if code != EMPTY}
+
+    def add_observer(self, observer):
+        self.observers.append(observer)
+
+    # Whether anybody is still contagious, given a day's dict_count
+    def is_spreading(self, dict_count):
+        return dict_count["infected"] > 0 or dict_count["symptomatic"] > 0
+
+    # Simulates one day, lets the observers know, and returns the dict_count
+    def step(self):
+        # update the clock
+        self.clock += 1
+        self.new_infections = 0
+        self.new_deaths = 0
+        # Call the update_grid method to go through each person and update
+        # their status, move around, etc...
+        self.update_grid()
+        dict_count = self.count_states()
+        if self.is_spreading(dict_count) and dict_count["symptomatic"] > self.maxsymp:
+            self.maxsymp = dict_count["symptomatic"]
+            self.peak_day = self.clock
+        self.stats = DayStats(self.clock, dict_count["susceptable"], dict_count["infected"],
+                              dict_count["symptomatic"], dict_count["recovered"], dict_count["dead"],
+                              self.new_infections, self.new_deaths, self.maxsymp, self.peak_day)
+        # Let the window, graph, etc... know about the new day
+        for observer in self.observers:
+            observer.day_finished(self, dict_count)
+        return dict_count
+
+    # Lets the observers know that the simulation is over
+    def finish(self, dict_count):
+        for observer in self.observers:
+            observer.finished(self, dict_count)
+
+    # How many blocks (see frontier_block) the grid has down and across
+    def block_shape(self):
+        return (-(-self.height // self.frontier_block), -(-self.width // self.frontier_block))
+
+    # The rectangles (top, bottom, left, right) of the grid around blocks,
+    # a boolean grid of them: each group of blocks touching each other
+    # (sideways or corner to corner) gets the rectangle around it, and any
+    # rectangles that overlap are merged.  Every block ends up in exactly
+    # one rectangle, and the rectangles are at least a block apart.
+    def block_boxes(self, blocks):
+        # Runs of blocks along each row of blocks, joined up with the runs
+        # they touch in the row above
+        runs = []
+        parent = []
+        def root(run):
+            while parent[run] != run:
+                parent[run] = parent[parent[run]]
+                run = parent[run]
+            return run
+        above = []
+        for row in np.flatnonzero(blocks.any(axis=1)):
+            edges = np.flatnonzero(np.diff(np.concatenate([[0], blocks[row].view(np.int8), [0]])))
+            if above and runs[above[0]][0] != row - 1:
+                above = []
+            here = []
+            for first, stop in zip(edges[::2].tolist(), edges[1::2].tolist()):
+                run = len(runs)
+                runs.append((row, first, stop))
+                parent.append(run)
+                for other in above:
+                    if runs[other][1] <= stop and first <= runs[other][2]:
+                        parent[root(other)] = run
+                here.append(run)
+            above = here
+
+        found = {}
+        for run, (row, first, stop) in enumerate(runs):
+            box = found.setdefault(root(run), [row, row + 1, first, stop])
+            box[0] = min(box[0], row)
+            box[1] = max(box[1], row + 1)
+            box[2] = min(box[2], first)
+            box[3] = max(box[3], stop)
+        boxes = list(found.values())
+        merged = True
+        while merged:
+            merged = False
+            for i in range(len(boxes)):
+                for j in range(i + 1, len(boxes)):
+                    a, b = boxes[i], boxes[j]
+                    if a[0] < b[1] and b[0] < a[1] and a[2] < b[3] and b[2] < a[3]:
+                        boxes[i] = [min(a[0], b[0]), max(a[1], b[1]), min(a[2], b[2]), max(a[3], b[3])]
+                        del boxes[j]
+                        merged = True
+                        break
+                if merged:
+                    break
+        size = self.frontier_block
+        return [(top * size, min(bottom * size, self.height), left * size, min(right * size, self.width))
+                for top, bottom, left, right in sorted(boxes)]
+
+    # Runs the whole pandemic until nobody is contagious any more, printing
+    # the results at the end if runCanvas
+    def update_loop(self, runCanvas=True):
+        return SimulationDriver(self, report=runCanvas).run()
+
+    # Saves everything needed to carry on this run later (see restoreRegion)
+    # as an NPZ file: the grid (see checkpoint_arrays), the clock, the peak
+    # so far, the settings and the seed, plus the series of the first
+    # TimeSeriesRecorder watching it.  The random numbers don't need saving,
+    # since they only depend on the seed and the day (see keyedRandom).
+    def save(self, path):
+        arrays = self.checkpoint_arrays()
+        arrays.update(engine=self.engine, settings=json.dumps(self.params.as_dict()),
+                      seed=np.uint64(self.seed), frontier=self.frontier,
+                      clock=self.clock, maxsymp=self.maxsymp, peak_day=self.peak_day)
+        if self.stats is not None:
+            arrays["stats"] = np.array(self.stats, dtype=np.int64)
+        for observer in self.observers:
+            if isinstance(observer, TimeSeriesRecorder):
+                arrays["series"] = observer.data[:observer.days]
+                break
+        np.savez(path, **arrays)
+
+    # Picks the clock and the peak so far back up from a checkpoint
+    def restore_clock(self, checkpoint):
+        self.clock = int(checkpoint["clock"])
+        self.maxsymp = int(checkpoint["maxsymp"])
+        self.peak_day = int(checkpoint["peak_day"])
+        if "stats" in checkpoint:
+            self.stats = DayStats(*(int(value) for value in checkpoint["stats"]))
+
+class Region(BaseRegion):
+    engine = "object"
+
+    # A Region is just the simulation: the grid, the people and the clock.
+    # It doesn't draw anything itself.  Anything that wants to watch the
+    # simulation (a window, a graph, ...) is an "observer" added with
+    # add_observer(); after every day its day_finished(region, dict_count)
+    # method is called, and once the pandemic is over its
+    # finished(region, dict_count) method.
+    # params are the settings of this run (see Parameters), and seed makes
+    # the run repeatable.  With frontier on, only the people near the
+    # outbreak roll for catching it (see near_outbreak).  checkpoint is for
+    # carrying on a saved run (see restoreRegion).
+    def __init__(self, params=None, seed=None, frontier=False, checkpoint=None):
+        self.params = params or Parameters()
+        self.frontier = frontier
+        self.height = self.params.height
+        self.width = self.params.width
+        # Each region has its own random numbers (see keyedRandom), so that
+        # runs side by side (or in other processes) don't affect each other
+        self.seed = runSeed(seed)
+
         # Variable to keep track of max symptomatics
         self.maxsymp = 0
-        # Need a "master" window.  tkinter.Tk is a class that makes and 
-        # controls an on-screen window for us.
-        self.master = tkinter.Tk()
-        if not runCanvas:
-            self.master.withdraw()
         
         # Make a clock to keep track of how many turns (days) the
         # simulation has run
         self.clock = 0
-        
-        # Update the window title (at top of window) to show time
-        self.master.title("Pandemic Day " + str(self.clock))
 
-        # Create a Canvas object on the window.  The beauty of abstraction
-        # is that you don't have to understand what this really means to 
-        # be able to use it!  (A "canvas" is an object for putting other
-        # visible objects on, so they show up on the screen.)
-        self.canvas = tkinter.Canvas(self.master, width=WIDTH*CELL_PIXEL_SIZE, height=HEIGHT*CELL_PIXEL_SIZE)
-        self.canvas.pack()
+        # Whatever is watching the simulation
+        self.observers = []
 
         # A list of people objects
         self.person_list = []
         
-        # Create a grid (2-D list) of where the people are
+        # Create a grid (2-D list) of where the people are, with a handful
+        # of "patient zero"s (see startingGrid), or everybody just as they
+        # were in the checkpoint.  Everybody keeps their number from the
+        # checkpoint, since that picks their random numbers.
+        if checkpoint is None:
+            start = startingGrid(self.params, self.seed).tolist()
+        else:
+            start = checkpoint["state"].tolist()
+            saved_days = checkpoint["days_left"].tolist()
+            numbers = checkpoint["number"].tolist()
         self.grid = []
-        for row in range(HEIGHT):
+        for row in range(self.height):
             self.grid.append([])
-            for col in range(WIDTH):
-                if random.random() < POPULATION_DENSITY:
-                    person = Person(self, row, col)
+            for col in range(self.width):
+                if start[row][col] != EMPTY:
+                    if checkpoint is None:
+                        person = Person(self, row, col, len(self.person_list))
+                        if start[row][col] == INFECTED:
+                            person.state = INFECTED
+                            person.days_left = self.params.infection_length
+                    else:
+                        person = Person(self, row, col, numbers[row][col])
+                        person.state = start[row][col]
+                        person.days_left = saved_days[row][col]
                     self.grid[row].append(person)
                     self.person_list.append(person)
                 else:
-                    self.grid[row].append("empty")
-        
-        # Start off with a handful a "patient zero"s.
-        for x in range(STARTING_INFECTED):
-            unlucky_person = random.choice(self.person_list)
-            unlucky_person.state = "infected"
-            unlucky_person.days_left = INFECTION_LENGTH
-            
-        # A parallel grid (2-D list) for storing "canvas rectangle" objects.
-        # Again, you don't need to understand this part very well to use it.
-        # It will paint each "cell" on the screen
-        self.canvas_grid = []
-        for row in range(HEIGHT):
-            self.canvas_grid.append([])
-            for col in range(WIDTH):
-                rectangle = self.canvas.create_rectangle(col*CELL_PIXEL_SIZE,row*CELL_PIXEL_SIZE,\
-                    (col+1)*CELL_PIXEL_SIZE,(row+1)*CELL_PIXEL_SIZE, fill="grey", outline="black")
-                self.canvas_grid[row].append(rectangle)
-        self.canvas.update()
+                    self.grid[row].append(None)
+        if checkpoint is not None:
+            self.person_list.sort(key=lambda person: person.number)
+
+        # The log of the chance of dodging everybody contagious around each
+        # cell (see Person.update).  Worked out for the whole grid once here,
+        # then kept up to date by spread() as people move and change state.
+        # A checkpoint has it as it was, since working it out again adds it
+        # up in a different order, and the last digit can come out different.
+        contagious = np.zeros((self.height, self.width), dtype=bool)
+        for person in self.person_list:
+            if CONTAGIOUS[person.state]:
+                contagious[person.my_row, person.my_col] = True
+        self.kernel = pressure_kernel(self.params.contagion_factor)
+        if checkpoint is not None and checkpointParameters(checkpoint).contagion_factor == self.params.contagion_factor:
+            self.pressure = np.array(checkpoint["pressure"])
+        else:
+            self.pressure = infection_pressure(contagious, self.params.contagion_factor)
+
+        # How many people are in each state, indexed by the state codes at
+        # the top of the file.  Counted once here, then kept up to date by
+        # Person.become().
+        self.tally = [0] * len(STATE_NAMES)
+        for person in self.person_list:
+            self.tally[person.state] += 1
 
+        # How many of the (up to 8) cells around each cell are empty.
+        # Counted once here, then kept up to date by update_empty_count() as
+        # people move, so that Person.socialDistance can just look it up.
+        # It's one flat list with a one cell border, so (row, col) is at
+        # (row + 1) * (width + 2) + col + 1, and the cells around any cell
+        # are always the same steps away in the list (neighbor_steps).
+        stride = self.width + 2
+        self.neighbor_steps = [dr * stride + dc for dr, dc in NEIGHBOR_OFFSETS]
+        self.empty_count = [0] * (stride * (self.height + 2))
+        for row in range(self.height):
+            for col in range(self.width):
+                self.empty_count[(row + 1) * stride + col + 1] = self.count_empty_neighbors(row, col)
+
+        # Everybody contagious right now, kept up to date by Person.become()
+        self.contagious = {}
+        for person in self.person_list:
+            if CONTAGIOUS[person.state]:
+                self.contagious[person] = True
+
+        # How many people are contagious in each block of the grid (see
+        # frontier_block) and the blocks next to it, kept up to date by
+        # mark_outbreak() as they move and change state.
+        block_rows, block_cols = self.block_shape()
+        self.near = [[0] * block_cols for row in range(block_rows)]
+        for person in self.contagious:
+            self.mark_outbreak(person.my_row, person.my_col, 1)
+
+        if checkpoint is not None:
+            self.restore_clock(checkpoint)
+
+    # Adds (sign=1) or takes away (sign=-1) the infection pressure of a
+    # contagious person at (row, col), when they arrive or leave, or start or
+    # stop being contagious.
+    def spread(self, row, col, sign):
+        self.pressure[row:row + 7, col:col + 7] += sign * self.kernel
+
+    # How many of the cells around (row, col) are empty, looking at the grid
+    def count_empty_neighbors(self, row, col):
+        count = 0
+        for r in range(max(row - 1, 0), min(row + 2, self.height)):
+            for c in range(max(col - 1, 0), min(col + 2, self.width)):
+                if (r != row or c != col) and self.grid[r][c] is None:
+                    count += 1
+        return count
+
+    # Updates empty_count when somebody moves from (old_row, old_col) to
+    # (new_row, new_col): the cells around where they left have one more
+    # empty neighbor, and the cells around where they arrived have one
+    # fewer.  (Counts in the border get changed too, but are never read.)
+    def update_empty_count(self, old_row, old_col, new_row, new_col):
+        empty_count = self.empty_count
+        stride = self.width + 2
+        left = (old_row + 1) * stride + old_col + 1
+        arrived = (new_row + 1) * stride + new_col + 1
+        for step in self.neighbor_steps:
+            empty_count[left + step] += 1
+            empty_count[arrived + step] -= 1
+
+    # Adds (sign=1) or takes away (sign=-1) somebody contagious in the
+    # block of (row, col), to the counts of that block and the blocks next
+    # to it
+    def mark_outbreak(self, row, col, sign):
+        block_row = row // self.frontier_block
+        block_col = col // self.frontier_block
+        for near_row in self.near[max(block_row - 1, 0):block_row + 2]:
+            for c in range(max(block_col - 1, 0), min(block_col + 2, len(near_row))):
+                near_row[c] += sign
+
+    # Whether anybody is contagious in the block of (row, col) or the blocks
+    # next to it.  Nobody further away is within 3 cells of (row, col), so
+    # when there isn't, its infection pressure is 0 and there's no need to
+    # roll.
+    def near_outbreak(self, row, col):
+        return self.near[row // self.frontier_block][col // self.frontier_block] > 0
+
+    # With frontier on, only the people near the outbreak get random
+    # numbers for developing symptoms, dying and catching it (see
+    # KeyedDraws); everybody still moves, so everybody gets those.
     def update_grid(self):
+        # Everybody's random numbers for today, worked out in one go (see
+        # keyedRandom) and kept as lists, which are quicker than arrays to
+        # look at one number at a time.
+        count = len(self.person_list)
+        self.draws = {}
+        for purpose in [MOVE + step for step in range(5)]:
+            self.draws[purpose] = keyedRandom(self.seed, self.clock, purpose, 0, count).tolist()
+        if self.frontier:
+            # The people in the rectangles around the blocks near somebody
+            # contagious (see near_outbreak) get theirs in advance, which
+            # is everybody who needs them unless the outbreak gets to new
+            # blocks during the day.
+            numbers = []
+            for top, bottom, left, right in self.block_boxes(np.array(self.near) > 0):
+                numbers.extend(person.number for row in self.grid[top:bottom] for person in row[left:right] if person is not None)
+            numbers = np.sort(np.array(numbers, dtype=np.int64))
+            for purpose in [SYMPTOMS, DEATH, INFECTION]:
+                self.draws[purpose] = KeyedDraws(self.seed, self.clock, purpose)
+                self.draws[purpose].draw(numbers)
+        else:
+            for purpose in [SYMPTOMS, DEATH, INFECTION]:
+                self.draws[purpose] = keyedRandom(self.seed, self.clock, purpose, 0, count).tolist()
+
         # Want to update the people in random order each time.
         # (Otherwise, if they're always getting updated starting in the
         # upper-left corner, they tend to all drift up and to the left over 
         # time.)
-        random.shuffle(self.person_list)
+        order = keyedRandom(self.seed, self.clock, ORDER, 0, count)
+        people = [self.person_list[i] for i in np.argsort(order).tolist()]
         
         # Go through all of the person objects and call their update method.
         # This will check all of the things that can happen to a person
         # (Get better, develop symptoms, die, get infected, move around)
-        for p in self.person_list:
+        for p in people:
             p.update()
-    
-    def update_canvas_grid(self):
-        # This function goes through each entry in the grid (either 
-        # the string "empty" or a Person object) and paints the associated
-        # cell the correct color based on their status.
-    
-        for row in range(HEIGHT):
-            for col in range(WIDTH):
-                if self.grid[row][col] == "empty":
-                    color = "black"
-                else:
-                    state = self.grid[row][col].state
-                    if state == "infected":
-                        color = "red"
-                    elif state == "symptomatic":
-                        color = "brown"
-                    elif state == "recovered":
-                        color = "green"
-                    elif state == "dead":
-                        color = "yellow"
-                    else:
-                        color = "white"
-                # Now that I know what color, I can update the "rectangle" object
-                # I created in the __init__ method to show up that color on 
-                # the canvas.  You don't need to understand this part to use it.
-                self.canvas.itemconfig(self.canvas_grid[row][col], \
-                                  fill=color, outline=color)
-        self.canvas.update()
-        
-    #Function used to plot individual plots on each simulation day
-    def plotSIRDgraph(self,dct):
-        x = self.clock
-        y1 = dct["susceptable"]
-        y2 = dct["infected"] + dct["symptomatic"]
-        y3 = dct["recovered"]
-        y4 = dct["dead"]             
-        plt.scatter(x, y1, c="b", label="susceptable")
-        plt.scatter(x, y2, c="r", label = "infectious")
-        plt.scatter(x, y3, c="g", label = "recovered")
-        plt.scatter(x, y4, c="y", label = "dead")
-        if x == 1:
-            plt.legend(loc="best")
+
+    # The grid as a 2-D array of the integer codes at the top of the file,
+    # which is what the observers draw from.
+    def state_grid(self):
+        codes = np.zeros((self.height, self.width), dtype=np.int8)
+        for person in self.person_list:
+            codes[person.my_row, person.my_col] = person.state
+        return codes
+
+    # Everybody's state, days left and number (-1 for empty cells), and the
+    # infection pressure, for save()
+    def checkpoint_arrays(self):
+        days_left = np.zeros((self.height, self.width), dtype=np.int16)
+        number = np.full((self.height, self.width), -1, dtype=np.int32)
+        for person in self.person_list:
+            days_left[person.my_row, person.my_col] = person.days_left
+            number[person.my_row, person.my_col] = person.number
+        return {"state": self.state_grid(), "days_left": days_left, "number": number, "pressure": self.pressure}
             
-    def update_loop(self, runCanvas=True):
-        # update the clock
+# Prints the outcome of a finished simulation from its final dict_count
+def printResults(maxsymp, dict_count):
+    print("The max number of symptomatics at one time was {} people".format(maxsymp))
+    total_people = dict_count["recovered"] + dict_count["dead"] + dict_count["susceptable"]
+    print("{:0.2f}% of people recovered from the pandemic and {:0.2f}% of people died from the pandemic".format(
+    dict_count["recovered"]/total_people*100, dict_count["dead"]/total_people*100))
+
+# Returns the part of a padded array that lines up with the real grid after
+# stepping (dr, dc) away from every cell.  The arrays of the NumPy engine have
+# a one cell WALL border, so a step of up to one cell never leaves the array.
+# Any leading axes (for example, a stack of replicas) are passed through.
+def shifted(padded, dr, dc):
+    height = padded.shape[-2] - 2
+    width = padded.shape[-1] - 2
+    return padded[..., 1 + dr:1 + dr + height, 1 + dc:1 + dc + width]
+
+# The NumPy version of Region.  Instead of a Person object per cell, the grid
+# is stored as arrays of small integers (the codes at the top of the file) and
+# every phase of a day (moving, getting better, developing symptoms, dying and
+# catching it) is done for the whole grid at once.  Everybody updates in
+# groups rather than one after the other, so single runs differ from the
+# object engine, and the averages over many runs only match it as closely
+# as order_groups allows (see there).
+class VectorRegion(BaseRegion):
+    engine = "vector"
+
+    # With frontier on, each day only rolls for catching it around the
+    # outbreak (see update_grid).  checkpoint is for carrying on a saved run
+    # (see restoreRegion).
+    def __init__(self, params=None, seed=None, frontier=False, checkpoint=None):
+        self.params = params or Parameters()
+        self.frontier = frontier
+        self.height = self.params.height
+        self.width = self.params.width
+        self.maxsymp = 0
+        self.clock = 0
+        self.seed = runSeed(seed)
+        self.kernel = pressure_kernel(self.params.contagion_factor)
+
+        # What is in each cell, and how many days that person has left to be
+        # sick.  Both have a one cell border; self.state and self.days_left
+        # are views of just the real grid.
+        self.cells = np.full((self.height + 2, self.width + 2), WALL, dtype=np.int8)
+        self.days = np.zeros((self.height + 2, self.width + 2), dtype=np.int16)
+        self.state = shifted(self.cells, 0, 0)
+        self.days_left = shifted(self.days, 0, 0)
+
+        if checkpoint is None:
+            self.state[:] = startingGrid(self.params, self.seed)
+            self.days_left[self.state == INFECTED] = self.params.infection_length
+        else:
+            self.state[:] = checkpoint["state"]
+            self.days_left[:] = checkpoint["days_left"]
+            self.restore_clock(checkpoint)
+
+        # How many people are in each state (see Region).  Counted once
+        # here, then kept up to date by set_state().
+        self.tally = np.bincount(self.state.ravel(), minlength=len(STATE_NAMES))
+
+        # Which blocks of the grid (see frontier_block) have somebody
+        # contagious in them, for frontier mode
+        self.active = np.zeros(self.block_shape(), dtype=bool)
+        self.find_contagious(0, self.height, 0, self.width)
+
+        # Whatever is watching the simulation (see Region)
+        self.observers = []
+
+    # Whether each cell has somebody (alive or dead) in it
+    @property
+    def occupancy(self):
+        return self.state != EMPTY
+
+    # The raw keyedBits for the cells of the grid from (top, left), in the
+    # given (rows, cols) shape, for today
+    def cell_bits(self, purpose, top, left, shape):
+        rows, cols = shape
+        block = keyedBits(self.seed, self.clock, purpose, top * self.width, rows * self.width)
+        return block.reshape(rows, self.width)[:, left:left + cols]
+
+    # Same as cell_bits, but keyedRandom numbers
+    def cell_random(self, purpose, top, left, shape):
+        return (self.cell_bits(purpose, top, left, shape) >> np.uint64(11)) * 2.0 ** -53
+
+    # Returns a boolean grid that is True where mask is and that cell's random
+    # number (from numbers) is below probability
+    def chance(self, mask, numbers, probability):
+        return mask & (numbers < probability)
+
+    # Changes everybody in mask (a boolean grid the shape of state) to
+    # new_state, keeping the tallies up to date.  Returns how many people
+    # that was.
+    def set_state(self, state, mask, new_state):
+        before = np.bincount(state[mask], minlength=len(STATE_NAMES))
+        changed = int(before.sum())
+        self.tally -= before
+        self.tally[new_state] += changed
+        state[mask] = new_state
+        return changed
+
+    # One step of movement for everybody in movers (a boolean grid).  Same
+    # rule as Person.move and Person.socialDistance: look at the empty cells
+    # around you and go to one of those with the most empty neighbors.  Since
+    # everybody picks at the same time, when two people pick the same cell
+    # the one with the highest random priority gets it and the others stay.
+    # cells and days are (a piece of) self.cells and self.days, with a one
+    # cell border; people only ever move into the inside of it.
+    # tiebreak and priority are each cell's random bits for breaking ties
+    # between spots and random number for settling who gets a cell.
+    def move_step(self, cells, days, movers, tiebreak, priority):
+        choice = self.pick_spots(cells, movers, tiebreak)
+        padded = np.zeros(cells.shape)
+        shifted(padded, 0, 0)[:] = priority
+        self.apply_moves(cells, days, self.settle_claims(choice, padded))
+
+    # Where each of the movers would like to go: the index + 1 in
+    # NEIGHBOR_OFFSETS of the spot they pick, or 0 to stay put.  Same shape
+    # as cells, but only the inside is filled in.
+    def pick_spots(self, cells, movers, tiebreak):
+        empty = cells == EMPTY
+
+        # How many empty cells are around each cell
+        open_count = np.zeros(cells.shape, dtype=np.int16)
+        inner = shifted(open_count, 0, 0)
+        for dr, dc in NEIGHBOR_OFFSETS:
+            inner += shifted(empty, dr, dc)
+
+        # Pick a spot.  Ties are broken by a random byte per direction, from
+        # the 8 bytes of each cell's tiebreak bits.
+        tiebreak = np.ascontiguousarray(tiebreak).view(np.uint8).reshape(movers.shape + (8,))
+        best = np.full(movers.shape, -1, dtype=np.int16)
+        choice = np.zeros(cells.shape, dtype=np.int8)
+        picked = shifted(choice, 0, 0)
+        for k, (dr, dc) in enumerate(NEIGHBOR_OFFSETS):
+            score = np.where(shifted(empty, dr, dc), shifted(open_count, dr, dc) * 256 + tiebreak[..., k], -1)
+            better = movers & (score > best)
+            best[better] = score[better]
+            picked[better] = k + 1
+        return choice
+
+    # Settles who gets each empty cell, given everybody's choice (from
+    # pick_spots) and a random priority for each cell (both the shape of
+    # cells).  Returns which of the people around each cell gets to move in,
+    # like pick_spots but for the inside of the grid only.
+    def settle_claims(self, choice, priority):
+        shape = choice.shape[:-2] + (choice.shape[-2] - 2, choice.shape[-1] - 2)
+        winner_priority = np.full(shape, -1.0)
+        winner = np.zeros(shape, dtype=np.int8)
+        for k, (dr, dc) in enumerate(NEIGHBOR_OFFSETS):
+            claims = np.where(shifted(choice, -dr, -dc) == k + 1, shifted(priority, -dr, -dc), -1)
+            better = claims > winner_priority
+            winner_priority[better] = claims[better]
+            winner[better] = k + 1
+        return winner
+
+    # Moves the winners (from settle_claims) into their new cells
+    def apply_moves(self, cells, days, winner):
+        # Targets were empty and movers weren't, so copying everybody in
+        # before clearing where they came from is safe.
+        state = shifted(cells, 0, 0)
+        days_left = shifted(days, 0, 0)
+        moved = np.zeros(cells.shape, dtype=bool)
+        for k, (dr, dc) in enumerate(NEIGHBOR_OFFSETS):
+            arriving = winner == k + 1
+            state[arriving] = shifted(cells, -dr, -dc)[arriving]
+            days_left[arriving] = shifted(days, -dr, -dc)[arriving]
+            shifted(moved, -dr, -dc)[arriving] = True
+        cells[moved] = EMPTY
+        days[moved] = 0
+
+    # Adds (sign=1) or takes away (sign=-1) the infection pressure of the
+    # people in mask, when they start or stop being contagious.
+    def spread(self, pressure, mask, sign):
+        rows, cols = np.nonzero(mask)
+        if len(rows) == 0:
+            return
+        for dr in range(-3, 4):
+            for dc in range(-3, 4):
+                if dr != 0 or dc != 0:
+                    pressure[rows + 3 + dr, cols + 3 + dc] += sign * self.kernel[dr + 3, dc + 3]
+
+    # How many groups the people are split into each day (see
+    # update_health).  With fewer, it spreads slower than the object engine:
+    # over 150 runs of the default settings, 16 groups gave an average peak
+    # of 706 symptomatic people over 16.07 days against the object engine's
+    # 729 over 15.48, while 128 give 728 over 15.61, which is within the
+    # noise of that many runs (about 5 people and 0.11 days either way).
+    # The extra groups made a day of a 1000x1000 grid about 30% slower.
+    order_groups = 128
+
+    # The blocks are only looked at once a day, so with frontier on they
+    # need to be big enough that nobody past the next one can catch it from
+    # anybody in them.  In a day somebody contagious can move 5 steps, and
+    # then it can be passed on at most 3 cells further in each of the
+    # order_groups groups, 389 cells in all.
+    frontier_block = 512
+
+    # Marks which blocks of the rectangle (top, bottom, left, right) of the
+    # grid have somebody contagious in them, in self.active.  The rectangle
+    # is made of whole blocks (or goes to the edge of the grid).  It's
+    # looked at a row of blocks at a time, so that ChunkedRegion only needs
+    # that much of the grid in memory.
+    def find_contagious(self, top, bottom, left, right):
+        size = self.frontier_block
+        starts = np.arange(0, right - left, size)
+        for block_top in range(top, bottom, size):
+            state = self.state[block_top:min(block_top + size, bottom), left:right]
+            contagious = ((state == INFECTED) | (state == SYMPTOMATIC)).any(axis=0)
+            self.active[block_top // size, left // size:left // size + len(starts)] = np.logical_or.reduceat(contagious, starts)
+
+    # Same as Region.update_grid, but a phase at a time for the whole grid.
+    # With frontier on, everybody still moves, but only the rectangles
+    # around the blocks with somebody contagious in them and the blocks next
+    # to those (see block_boxes) roll for catching it, so that part of the
+    # day costs about as much as the outbreak is big rather than the whole
+    # region.  Nobody else can catch it today, and each rectangle has
+    # everybody who can pass it on to the people in it, so it comes out
+    # exactly the same as with frontier off.
+    def update_grid(self):
+        if not self.frontier:
+            self.update_area(self.cells, self.days, 0, 0)
+            return
+        self.move_area(self.cells, self.days, 0, 0)
+        near = self.active.copy()
+        padded = np.pad(self.active, 1)
+        for dr, dc in NEIGHBOR_OFFSETS:
+            near |= shifted(padded, dr, dc)
+        boxes = self.block_boxes(near)
+        for top, bottom, left, right in boxes:
+            self.update_health(self.cells[top:bottom + 2, left:right + 2], self.days[top:bottom + 2, left:right + 2], top, left)
+        # Everybody contagious is inside those rectangles now, so that's all
+        # that needs looking at to find them again.
+        self.active[:] = False
+        for box in boxes:
+            self.find_contagious(*box)
+
+    # Runs a day for the people in cells and days, (a piece of) self.cells
+    # and self.days with a one cell border, whose inside starts at (top,
+    # left) of the grid: moving (move_area), then everything else
+    # (update_health).
+    def update_area(self, cells, days, top, left):
+        self.move_area(cells, days, top, left)
+        self.update_health(cells, days, top, left)
+
+    # The 5 steps of movement of a day for cells and days (see update_area)
+    def move_area(self, cells, days, top, left):
+        state = shifted(cells, 0, 0)
+        for step in range(5):
+            self.move_step(cells, days, self.movers(state, step),
+                           self.cell_bits(MOVE + step, top, left, state.shape),
+                           self.cell_random(PRIORITY + step, top, left, state.shape))
+
+    # Getting better, developing symptoms, dying and catching it for cells
+    # and days (see update_area).  Nobody contagious may be within 3 cells
+    # of the outside of it, since their pressure isn't counted.
+    def update_health(self, cells, days, top, left):
+        state = shifted(cells, 0, 0)
+        days_left = shifted(days, 0, 0)
+
+        pressure = self.pressure_grid(state)
+        inner = pressure[..., 3:-3, 3:-3]
+
+        # Region.update_grid updates people one after the other in a random
+        # order, so somebody infected early in the day can already pass it on
+        # to people updated later that same day.  Updating everyone at once
+        # loses that and the pandemic spreads noticeably slower, so instead
+        # people are dealt into groups in a random order and each group sees
+        # the changes of the groups before it.
+        group = (self.cell_random(ORDER, top, left, state.shape) * self.order_groups).astype(np.int8)
+        draws = [self.cell_random(purpose, top, left, state.shape) for purpose in [SYMPTOMS, DEATH, INFECTION]]
+        for turn in range(self.order_groups):
+            stopped, started = self.update_group(state, days_left, inner, group == turn, draws)
+            self.spread(pressure, stopped, -1)
+            self.spread(pressure, started, 1)
+
+    # The infection_pressure of everybody contagious in state (a grid of
+    # state codes).  It's a method so that PhaseProfiler can time it.
+    def pressure_grid(self, state):
+        return infection_pressure((state == INFECTED) | (state == SYMPTOMATIC), self.params.contagion_factor)
+
+    # Who moves on each of the 5 steps of a day.  Healthy-feeling people take
+    # 5 steps, sick-feeling people take 1, and the dead stay put.
+    def movers(self, state, step):
+        if step == 0:
+            return (state != EMPTY) & (state != DEAD)
+        return (state == SUSCEPTIBLE) | (state == INFECTED) | (state == RECOVERED)
+
+    # Gets better, develops symptoms, dies or catches it, for the people in
+    # mine, given the infection pressure on them (inner) and today's random
+    # numbers for SYMPTOMS, DEATH and INFECTION (draws).  Returns who
+    # stopped being contagious and who started, so that the pressure can be
+    # updated for the next group.
+    def update_group(self, state, days_left, inner, mine, draws):
+        params = self.params
+        symptoms, death, infection = draws
+
+        # If you're sick, you're one day closer to getting better
+        sick = mine & ((state == INFECTED) | (state == SYMPTOMATIC))
+        days_left[sick] -= 1
+        recovered = sick & (days_left <= 0)
+        self.set_state(state, recovered, RECOVERED)
+
+        # If you're infected, you have a chance of developing symptoms
+        self.set_state(state, self.chance(mine & (state == INFECTED), symptoms, params.symptom_chance), SYMPTOMATIC)
+
+        # If you're symptomatic, you have a chance of dying.
+        died = self.chance(mine & (state == SYMPTOMATIC), death, params.mortality_rate / params.infection_length)
+        self.new_deaths += self.set_state(state, died, DEAD)
+
+        # If you're susceptable, you have a chance of getting infected.
+        # (Anybody in this group who just got better or died still counts
+        # until the next group.)
+        exposed = mine & (state == SUSCEPTIBLE) & (inner < 0)
+        caught = exposed.copy()
+        caught[exposed] = infection[exposed] < -np.expm1(inner[exposed])
+        self.new_infections += self.set_state(state, caught, INFECTED)
+        days_left[caught] = np.broadcast_to(params.infection_length, days_left.shape)[caught]
+        return recovered | died, caught
+
+    # The grid as a 2-D array of state codes, for the observers
+    def state_grid(self):
+        return self.state
+
+    # The grid and days left, for save()
+    def checkpoint_arrays(self):
+        return {"state": self.state, "days_left": self.days_left}
+
+# VectorRegion split between worker processes, for regions too big for one
+# core.  The grid is cut into strips of rows (tiles), one per worker, and
+# the grid lives in shared memory so that every worker can see the rows
+# next to its own (the halo) without copying them around.  Each worker runs
+# the same phases of a day as VectorRegion for its own rows, and the
+# workers wait for each other between phases (see Tile), so a run with any
+# number of workers gives exactly the same results as VectorRegion (the
+# random numbers don't depend on who draws them, see keyedRandom).
+# Call close() (or finish()) when done with it, to stop the workers.
+class TiledRegion(VectorRegion):
+    engine = "tiled"
+
+    def __init__(self, params=None, seed=None, workers=None, checkpoint=None):
+        import multiprocessing
+        super().__init__(params, seed, checkpoint=checkpoint)
+        self.workers = max(1, min(workers or os.cpu_count() or 1, self.height))
+
+        # Move the grid into shared memory, along with what the workers
+        # tell each other during a day.  layout says where to find each of
+        # them: {name: (shared memory name, shape, dtype)}
+        self.blocks = []
+        self.layout = {}
+        self.cells = self.share("cells", self.cells)
+        self.days = self.share("days", self.days)
+        self.state = shifted(self.cells, 0, 0)
+        self.days_left = shifted(self.days, 0, 0)
+        self.share("choice", np.zeros(self.cells.shape, dtype=np.int8))
+        self.share("priority", np.zeros(self.cells.shape))
+        self.share("changes", np.zeros((2, self.height, self.width), dtype=np.int8))
+
+        # Start a worker for each strip of rows
+        barrier = multiprocessing.Barrier(self.workers)
+        self.barrier = barrier
+        self.connections = []
+        self.processes = []
+        for i in range(self.workers):
+            top = self.height * i // self.workers
+            bottom = self.height * (i + 1) // self.workers
+            connection, worker_end = multiprocessing.Pipe()
+            process = multiprocessing.Process(target=runTile, daemon=True,
+                                              args=(self.params, self.seed, self.layout, top, bottom, barrier, worker_end))
+            process.start()
+            worker_end.close()
+            self.connections.append(connection)
+            self.processes.append(process)
+
+    # Copies array into a new block of shared memory, and returns the copy
+    def share(self, name, array):
+        import multiprocessing.shared_memory
+        block = multiprocessing.shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+        shared = np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)
+        shared[:] = array
+        self.blocks.append(block)
+        self.layout[name] = (block.name, array.shape, array.dtype.str)
+        return shared
+
+    # Has every worker run the day for its rows, and adds up what happened.
+    # A worker that dies without sending back what went wrong (killed for
+    # running out of memory, say) would leave the others waiting for it
+    # forever, so they're let go (see runTile) and it's an error too.
+    def update_grid(self):
+        import multiprocessing.connection
+        for connection in self.connections:
+            try:
+                connection.send(self.clock)
+            except OSError:
+                pass
+        errors = []
+        replies = []
+        waiting = dict(zip(self.connections, self.processes))
+        while waiting:
+            ready = multiprocessing.connection.wait(list(waiting) + [process.sentinel for process in waiting.values()])
+            for connection, process in list(waiting.items()):
+                if connection in ready or process.sentinel in ready:
+                    del waiting[connection]
+                    try:
+                        replies.append(connection.recv())
+                    except (EOFError, OSError):
+                        process.join()
+                        errors.append("A worker stopped without saying why (exit code {})".format(process.exitcode))
+                        self.barrier.abort()
+        for reply in replies:
+            if isinstance(reply, str):
+                errors.append(reply)
+                continue
+            tally, new_infections, new_deaths = reply
+            self.tally += tally
+            self.new_infections += new_infections
+            self.new_deaths += new_deaths
+        if errors:
+            self.close()
+            raise RuntimeError("A tile worker failed:\n" + errors[0])
+
+    def finish(self, dict_count):
+        super().finish(dict_count)
+        self.close()
+
+    # Stops the workers and frees the shared memory.  The grid is copied out
+    # first, so that the region can still be looked at afterwards.
+    def close(self):
+        if not self.processes:
+            return
+        for connection in self.connections:
+            try:
+                connection.send(None)
+            except OSError:
+                pass
+        for process in self.processes:
+            process.join(5)
+            if process.is_alive():
+                process.terminate()
+        self.processes = []
+        self.connections = []
+        self.cells = self.cells.copy()
+        self.days = self.days.copy()
+        self.state = shifted(self.cells, 0, 0)
+        self.days_left = shifted(self.days, 0, 0)
+        for block in self.blocks:
+            try:
+                block.close()
+            except BufferError:
+                # Something outside still has a view of it; it's freed once
+                # that's gone
+                pass
+            block.unlink()
+        self.blocks = []
+
+# The strip of rows top to bottom of a TiledRegion that one worker looks
+# after.  It borrows the phases of a day from VectorRegion, running them
+# straight on the shared arrays, and the workers wait for each other
+# (barrier) whenever one of them is about to look at rows that another one
+# changes.  A step of movement, for example, goes:
+#   1. pick where your people want to go, looking 2 rows past your own
+#      (everybody is only reading), and share those choices
+#   2. wait, then settle who gets each cell in and next to your rows, from
+#      the shared choices, and work out your new rows on a copy
+#   3. wait until everybody has finished reading, then write your rows
+#   4. wait until everybody has finished writing
+# and catching it looks at the people contagious up to 3 rows past your
+# own, sharing who started or stopped being contagious after each group.
+class Tile(VectorRegion):
+    def __init__(self, params, seed, layout, top, bottom, barrier):
+        import multiprocessing.shared_memory
+        self.params = params
+        self.height = params.height
+        self.width = params.width
+        self.seed = seed
+        self.clock = 0
+        self.kernel = pressure_kernel(params.contagion_factor)
+        self.top = top
+        self.bottom = bottom
+        self.barrier = barrier
+        self.blocks = []
+        for name, (block_name, shape, dtype) in layout.items():
+            block = multiprocessing.shared_memory.SharedMemory(block_name)
+            self.blocks.append(block)
+            setattr(self, name, np.ndarray(shape, dtype=dtype, buffer=block.buf))
+        self.state = shifted(self.cells, 0, 0)
+        self.days_left = shifted(self.days, 0, 0)
+
+    # The padded rows [start, stop) of this tile plus halo rows each side
+    def window(self, halo):
+        return max(self.top + 1 - halo, 0), min(self.bottom + 1 + halo, self.height + 2)
+
+    # Runs the day for this tile's rows.  Returns the change in the tallies
+    # and how many were newly infected and died.
+    def run_day(self):
+        self.tally = np.zeros(len(STATE_NAMES), dtype=np.int64)
+        self.new_infections = 0
+        self.new_deaths = 0
+        for step in range(5):
+            self.shared_move_step(step)
+        self.update_groups()
+        return self.tally, self.new_infections, self.new_deaths
+
+    def shared_move_step(self, step):
+        start, stop = self.window(2)
+        mine = slice(self.top + 1, self.bottom + 1)
+        own = slice(self.top + 1 - start, self.bottom + 1 - start)
+        cells = self.cells[start:stop]
+        state = shifted(cells, 0, 0)
+        choice = self.pick_spots(cells, self.movers(state, step), self.cell_bits(MOVE + step, start, 0, state.shape))
+        self.choice[mine] = choice[own]
+        self.priority[mine, 1:-1] = self.cell_random(PRIORITY + step, self.top, 0, (self.bottom - self.top, self.width))
+        self.barrier.wait()
+
+        winner = self.settle_claims(self.choice[start:stop], self.priority[start:stop])
+        cells = cells.copy()
+        days = self.days[start:stop].copy()
+        self.apply_moves(cells, days, winner)
+        self.barrier.wait()
+
+        self.cells[mine] = cells[own]
+        self.days[mine] = days[own]
+        self.barrier.wait()
+
+    def update_groups(self):
+        top, bottom = self.top, self.bottom
+        start = max(top - 3, 0)
+        stop = min(bottom + 3, self.height)
+        area = self.state[start:stop]
+        pressure = self.pressure_grid(area)
+        inner = pressure[3 + top - start:3 + bottom - start, 3:-3]
+        # Nobody changes state until everybody has their pressure
+        self.barrier.wait()
+
+        state = self.state[top:bottom]
+        days_left = self.days_left[top:bottom]
+        group = (self.cell_random(ORDER, top, 0, state.shape) * self.order_groups).astype(np.int8)
+        draws = [self.cell_random(purpose, top, 0, state.shape) for purpose in [SYMPTOMS, DEATH, INFECTION]]
+        for turn in range(self.order_groups):
+            stopped, started = self.update_group(state, days_left, inner, group == turn, draws)
+            # Alternating between two copies of changes means nobody can
+            # overwrite a group's changes before everybody has read them.
+            changes = self.changes[turn % 2]
+            changes[top:bottom] = started.astype(np.int8) - stopped
+            self.barrier.wait()
+            nearby = changes[start:stop]
+            self.spread(pressure, nearby < 0, -1)
+            self.spread(pressure, nearby > 0, 1)
+
+# The worker process for a Tile.  Runs a day each time it's sent the day's
+# number, until it's sent None.  If the day fails, the other workers are
+# let go (they'd be waiting for this one forever) and the error is sent
+# back instead.
+def runTile(params, seed, layout, top, bottom, barrier, connection):
+    tile = Tile(params, seed, layout, top, bottom, barrier)
+    while True:
+        tile.clock = connection.recv()
+        if tile.clock is None:
+            break
+        try:
+            connection.send(tile.run_day())
+        except Exception:
+            import traceback
+            barrier.abort()
+            connection.send(traceback.format_exc())
+            break
+
+# Times a few days of a TiledRegion with 1, 2, ... max_workers workers, and
+# prints how much faster each is than 1 worker and how close that is to
+# ideal (the scaling efficiency: speedup / workers).
+def benchmarkScaling(params=None, max_workers=None, days=5, seed=0):
+    params = params or Parameters(width=2000, height=2000, starting_infected=2000)
+    max_workers = max_workers or os.cpu_count() or 1
+    results = []
+    for workers in range(1, max_workers + 1):
+        region = TiledRegion(params, seed, workers)
+        start = time.perf_counter()
+        for day in range(days):
+            region.step()
+        elapsed = (time.perf_counter() - start) / days
+        region.close()
+        if workers == 1:
+            single = elapsed
+        speedup = single / elapsed
+        print("{} workers: {:0.3f}s per day, {:0.2f}x faster than 1 worker, {:0.0f}% efficiency".format(
+            workers, elapsed, speedup, speedup / workers * 100))
+        results.append({"workers": workers, "seconds_per_day": elapsed,
+                        "speedup": speedup, "efficiency": speedup / workers})
+    return results
+
+# VectorRegion for regions too big to fit in memory.  The grid is kept in
+# files on disk, mapped into memory with np.memmap, and a day streams
+# through it a strip of chunk_rows rows at a time, so that only a few
+# strips are ever in memory at once no matter how big the grid is.  The
+# grid takes 4 bytes a cell on disk: the state, the days left and the
+# choices of a step of movement.  What the rest of a day needs (11 bytes a
+# cell, see chunked_groups) is only kept for the rectangles being updated,
+# and the random numbers are worked out again whenever they're needed.
+# With frontier on, only moving streams through the whole grid; the rest
+# of a day only reads and writes the rectangles around the outbreak (see
+# VectorRegion.update_grid).  It gives exactly the same results as
+# VectorRegion.  Call close() when done with it, to delete the files.
+class ChunkedRegion(VectorRegion):
+    engine = "chunked"
+
+    # The files go in directory, or in a temporary directory that's deleted
+    # again by close() (or once the region is garbage collected).
+    def __init__(self, params=None, seed=None, frontier=False, directory=None, chunk_rows=256, checkpoint=None):
+        self.params = params or Parameters()
+        self.frontier = frontier
+        self.height = self.params.height
+        self.width = self.params.width
+        self.maxsymp = 0
+        self.clock = 0
+        self.seed = runSeed(seed)
+        self.kernel = pressure_kernel(self.params.contagion_factor)
+        # Strips need to be at least 3 rows, so that nothing looks further
+        # than the next strip (see strips)
+        self.chunk_rows = max(chunk_rows, 6)
+
+        import tempfile
+        import shutil
+        import weakref
+        self.cleanup = None
+        if directory is None:
+            directory = tempfile.mkdtemp(prefix="pandemic-")
+            self.cleanup = weakref.finalize(self, shutil.rmtree, directory, True)
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.files = []
+
+        # The grid, with a one cell border like VectorRegion's
+        padded = (self.height + 2, self.width + 2)
+        self.cells = self.disk_array("cells", padded, np.int8)
+        self.days = self.disk_array("days", padded, np.int16)
+        self.state = shifted(self.cells, 0, 0)
+        self.days_left = shifted(self.days, 0, 0)
+        self.cells[0] = WALL
+        self.cells[-1] = WALL
+        self.cells[:, 0] = WALL
+        self.cells[:, -1] = WALL
+
+        # Where everybody picked to go, between the passes of a step of
+        # movement (see chunked_move_step)
+        self.choice = self.disk_array("choice", padded, np.int8)
+
+        if checkpoint is None:
+            self.place_people()
+        else:
+            for top, bottom in self.strips(0, self.height):
+                self.state[top:bottom] = checkpoint["state"][top:bottom]
+                self.days_left[top:bottom] = checkpoint["days_left"][top:bottom]
+            self.restore_clock(checkpoint)
+
+        self.tally = np.zeros(len(STATE_NAMES), dtype=np.int64)
+        for top, bottom in self.strips(0, self.height):
+            self.tally += np.bincount(self.state[top:bottom].ravel(), minlength=len(STATE_NAMES))
+        self.active = np.zeros(self.block_shape(), dtype=bool)
+        self.find_contagious(0, self.height, 0, self.width)
+        self.observers = []
+
+    # A new file in self.directory, mapped as an array of zeros
+    def disk_array(self, name, shape, dtype):
+        path = os.path.join(self.directory, name + ".dat")
+        if path not in self.files:
+            self.files.append(path)
+        return np.memmap(path, dtype=dtype, mode="w+", shape=shape)
+
+    # Deletes the file of a disk_array that's no longer needed
+    def delete_array(self, name):
+        path = os.path.join(self.directory, name + ".dat")
+        if path in self.files:
+            os.remove(path)
+            self.files.remove(path)
+
+    # Splits rows start to stop into (top, bottom) strips of about
+    # chunk_rows rows each.  They're all at least half of chunk_rows (or
+    # the lot, if that's fewer), so at least 3 rows.
+    def strips(self, start, stop):
+        count = max(1, -(-(stop - start) // self.chunk_rows))
+        return [(start + (stop - start) * i // count, start + (stop - start) * (i + 1) // count)
+                for i in range(count)]
+
+    # Same as startingGrid, a strip at a time.  The "patient zero"s are the
+    # people with the lowest numbers for PATIENT_ZERO, so only the lowest
+    # seen so far need keeping.
+    def place_people(self):
+        lowest_luck = np.zeros(0)
+        lowest_where = np.zeros(0, dtype=np.int64)
+        for top, bottom in self.strips(0, self.height):
+            first = top * self.width
+            count = (bottom - top) * self.width
+            people = keyedRandom(self.seed, 0, PLACE, first, count) < self.params.population_density
+            self.state[top:bottom] = np.where(people, SUSCEPTIBLE, EMPTY).reshape(bottom - top, self.width)
+            where_people = np.flatnonzero(people)
+            luck = keyedRandom(self.seed, 0, PATIENT_ZERO, first, count)[where_people]
+            lowest_luck = np.concatenate([lowest_luck, luck])
+            lowest_where = np.concatenate([lowest_where, first + where_people])
+            # (Sorting just the ones up to the lowest few is much quicker
+            # than sorting the lot.)
+            lowest = self.params.starting_infected
+            if len(lowest_luck) > lowest > 0:
+                near = lowest_luck <= np.partition(lowest_luck, lowest - 1)[lowest - 1]
+                lowest_luck = lowest_luck[near]
+                lowest_where = lowest_where[near]
+            keep = np.argsort(lowest_luck, kind="stable")[:lowest]
+            lowest_luck = lowest_luck[keep]
+            lowest_where = lowest_where[keep]
+        rows, cols = np.divmod(lowest_where, self.width)
+        self.state[rows, cols] = INFECTED
+        self.days_left[rows, cols] = self.params.infection_length
+
+    # Same as VectorRegion.move_area and update_health, but each is a pass
+    # (or a few) over the strips instead of one go at the whole area (see
+    # chunked_move_step and chunked_groups).
+    def move_area(self, cells, days, top, left):
+        for step in range(5):
+            self.chunked_move_step(cells, days, top, left, step)
+
+    def update_health(self, cells, days, top, left):
+        self.chunked_groups(cells, days, top, left)
+
+    # One step of movement (see VectorRegion.move_step) for cells and days,
+    # a piece of self.cells and self.days whose inside starts at (top, left)
+    # of the grid.  The first pass has everybody pick a spot, the second
+    # settles who gets each one and moves them.  Each strip is written back
+    # only once the next one has been worked out, since that looks at the 2
+    # rows of it next to it as they were before the step (which is also how
+    # Tile does it).
+    def chunked_move_step(self, cells, days, top, left, step):
+        height = cells.shape[0] - 2
+        width = cells.shape[1] - 2
+        choice = self.choice[top:top + height + 2, left:left + width + 2]
+        # The border rows may be left over from another area
+        choice[0] = 0
+        choice[-1] = 0
+
+        for start, stop in self.strips(0, height):
+            first, last = max(start - 1, 0), min(stop + 3, height + 2)
+            area = cells[first:last]
+            picked = self.pick_spots(area, self.movers(shifted(area, 0, 0), step),
+                                     self.cell_bits(MOVE + step, top + first, left, (last - first - 2, width)))
+            choice[start + 1:stop + 1] = picked[start + 1 - first:stop + 1 - first]
+
+        pending = None
+        for start, stop in self.strips(0, height):
+            first, last = max(start - 1, 0), min(stop + 3, height + 2)
+            # Everybody's priority for settling who gets a cell, for rows
+            # first to last of cells (0 for the border, like move_step)
+            priority = np.zeros((last - first, width + 2))
+            low, high = max(first, 1), min(last, height + 1)
+            priority[low - first:high - first, 1:-1] = self.cell_random(PRIORITY + step, top + low - 1, left, (high - low, width))
+            winner = self.settle_claims(choice[first:last], priority)
+            moved_cells = np.array(cells[first:last])
+            moved_days = np.array(days[first:last])
+            self.apply_moves(moved_cells, moved_days, winner)
+            if pending is not None:
+                self.write_rows(cells, days, *pending)
+            pending = (start + 1, moved_cells[start + 1 - first:stop + 1 - first], moved_days[start + 1 - first:stop + 1 - first])
+        self.write_rows(cells, days, *pending)
+
+    # Copies rows of cells and days back, starting from row start
+    def write_rows(self, cells, days, start, new_cells, new_days):
+        cells[start:start + len(new_cells)] = new_cells
+        days[start:start + len(new_days)] = new_days
+
+    # Getting better, developing symptoms, dying and catching it (see
+    # VectorRegion.update_health) for cells and days, a piece of self.cells
+    # and self.days whose inside starts at (top, left) of the grid.  What
+    # each pass leaves for the next is kept in files the size of that piece,
+    # which are deleted again at the end: everybody's pressure, their group
+    # (turn), whether they stop being contagious at their turn (stops) and
+    # who started or stopped in the last group (changes).
+    def chunked_groups(self, cells, days, top, left):
+        height = cells.shape[0] - 2
+        width = cells.shape[1] - 2
+        state = shifted(cells, 0, 0)
+        days_left = shifted(days, 0, 0)
+        pressure = self.disk_array("pressure", (height + 6, width + 6), np.float64)
+        turn = self.disk_array("turn", (height, width), np.int8)
+        stops = self.disk_array("stops", (height, width), bool)
+        changes = self.disk_array("changes", (height, width), np.int8)
+
+        # The first pass works out everybody's pressure and group (their
+        # turn), and what happens to everybody who isn't susceptable.  That
+        # doesn't depend on anybody else, so it can happen straight away;
+        # only whether they stop being contagious is kept for their turn.
+        # Each strip is written back once the next one has its pressure,
+        # which needs the 3 rows of it next to it as they were.
+        pending = None
+        for start, stop in self.strips(0, height):
+            first, last = max(start - 3, 0), min(stop + 3, height)
+            area = state[first:last]
+            nearby = self.pressure_grid(area)
+            pressure[start + 3:stop + 3] = nearby[start + 3 - first:stop + 3 - first]
+            shape = (stop - start, width)
+            turn[start:stop] = (self.cell_random(ORDER, top + start, left, shape) * self.order_groups).astype(np.int8)
+            # (Nobody catches it in this pass, so INFECTION isn't needed yet.)
+            draws = [self.cell_random(purpose, top + start, left, shape) for purpose in [SYMPTOMS, DEATH]] + [np.zeros(shape)]
+            new_state = np.array(state[start:stop])
+            new_days = np.array(days_left[start:stop])
+            stopped, started = self.update_group(new_state, new_days, np.zeros(shape), np.ones(shape, dtype=bool), draws)
+            stops[start:stop] = stopped
+            if pending is not None:
+                self.write_rows(state, days_left, *pending)
+            pending = (start, new_state, new_days)
+        self.write_rows(state, days_left, *pending)
+
+        # Then a pass per group, catching it with the pressure so far.  The
+        # changes of a group are added to a strip's pressure once the next
+        # strip has had its turn, since that strip needs the pressure as it
+        # was before the group.  The INFECTION numbers are drawn again for
+        # each strip that has anybody who can catch it.
+        for group in range(self.order_groups):
+            pending = None
+            for start, stop in self.strips(0, height):
+                mine = turn[start:stop] == group
+                inner = pressure[start + 3:stop + 3, 3:-3]
+                exposed = mine & (state[start:stop] == SUSCEPTIBLE) & (inner < 0)
+                caught = exposed.copy()
+                if exposed.any():
+                    infection = self.cell_random(INFECTION, top + start, left, (stop - start, width))
+                    caught[exposed] = infection[exposed] < -np.expm1(inner[exposed])
+                self.new_infections += self.set_state(state[start:stop], caught, INFECTED)
+                days_left[start:stop][caught] = self.params.infection_length
+                changes[start:stop] = caught.astype(np.int8) - (mine & stops[start:stop])
+                if pending is not None:
+                    self.spread_rows(pressure, changes, *pending)
+                pending = (start, stop)
+            self.spread_rows(pressure, changes, *pending)
+
+        del pressure, turn, stops, changes
+        for name in ["pressure", "turn", "stops", "changes"]:
+            self.delete_array(name)
+
+    # Adds the pressure of everybody who started or stopped being contagious
+    # (changes, see chunked_groups) to rows start to stop of pressure
+    def spread_rows(self, pressure, changes, start, stop):
+        first, last = max(start - 3, 0), min(stop + 3, len(changes))
+        nearby = changes[first:last]
+        rows = np.array(pressure[first:last + 6])
+        self.spread(rows, nearby < 0, -1)
+        self.spread(rows, nearby > 0, 1)
+        pressure[start + 3:stop + 3] = rows[start + 3 - first:stop + 3 - first]
+
+    # Deletes the files.  The region can't be used after this.
+    def close(self):
+        self.cells = self.days = self.state = self.days_left = self.choice = None
+        for path in self.files:
+            if os.path.exists(path):
+                os.remove(path)
+        self.files = []
+        if self.cleanup is not None:
+            self.cleanup()
+
+# A method for EnsembleRegion that it gets from BaseRegion or VectorRegion
+# but can't do, since it's many regions rather than one
+def singleRegionOnly(name):
+    def method(self, *args, **kwargs):
+        raise TypeError("An EnsembleRegion can't {}(); use run() for its summaries, "
+                        "or a VectorRegion per replica".format(name))
+    return method
+
+# Many runs of VectorRegion at once, stacked along a leading axis of the
+# arrays, so that a day of all of them is one pass over the arrays rather
+# than a pass (and its Python overhead) per run.  Each run (replica) has
+# its own Parameters and seed, though they all need the same width and
+# height, and gives exactly the same results as VectorRegion with those.
+# Replicas where nobody is contagious any more are left out of the
+# following days.  It borrows VectorRegion's day, but it isn't a region
+# that can be watched, saved or run like the others: run() returns a
+# summary of each replica instead, and the rest of BaseRegion's ways of
+# doing things raise a TypeError (see singleRegionOnly).
+class EnsembleRegion(VectorRegion):
+    # The settings that can be different for each replica.  (Width and
+    # height can't be.)
+    varying = ["starting_infected", "population_density", "symptom_chance",
+               "mortality_rate", "infection_length", "contagion_factor"]
+
+    def __init__(self, params_list, seeds=None):
+        self.params_list = list(params_list)
+        self.replicas = len(self.params_list)
+        if seeds is None:
+            seeds = [None] * self.replicas
+        self.seeds = [runSeed(seed) for seed in seeds]
+        self.height = self.params_list[0].height
+        self.width = self.params_list[0].width
+        if any((params.height, params.width) != (self.height, self.width) for params in self.params_list):
+            raise ValueError("All the replicas of an ensemble need the same width and height")
+        self.frontier = False
+        self.clock = 0
+
+        # Each replica's settings, shaped (replicas, 1, 1) so that they line
+        # up with the grids
+        self.columns = {name: np.array([getattr(params, name) for params in self.params_list]).reshape(-1, 1, 1)
+                        for name in self.varying}
+        self.kernels = np.array([pressure_kernel(params.contagion_factor) for params in self.params_list])
+
+        self.cells = np.full((self.replicas, self.height + 2, self.width + 2), WALL, dtype=np.int8)
+        self.days = np.zeros(self.cells.shape, dtype=np.int16)
+        self.state = shifted(self.cells, 0, 0)
+        self.days_left = shifted(self.days, 0, 0)
+        for replica, params in enumerate(self.params_list):
+            self.state[replica] = startingGrid(params, self.seeds[replica])
+        self.days_left[self.state == INFECTED] = np.broadcast_to(self.columns["infection_length"], self.state.shape)[self.state == INFECTED]
+
+        # Tallies and results, a row per replica
+        self.tally = np.array([np.bincount(grid.ravel(), minlength=len(STATE_NAMES)) for grid in self.state])
+        self.maxsymp = np.zeros(self.replicas, dtype=np.int64)
+        self.peak_day = np.zeros(self.replicas, dtype=np.int64)
+        self.days_run = np.zeros(self.replicas, dtype=np.int64)
+        self.spreading = np.ones(self.replicas, dtype=bool)
+        self.replica_days = 0
+
+    # The raw keyedBits for the cells from (top, left) of each of the
+    # replicas being updated (self.live), each with its own seed
+    def cell_bits(self, purpose, top, left, shape):
+        replicas, rows, cols = shape
+        return np.stack([keyedBits(self.seeds[replica], self.clock, purpose, top * self.width, rows * self.width)
+                         .reshape(rows, self.width)[:, left:left + cols] for replica in self.live])
+
+    # Same as VectorRegion.set_state, but for a stack of the live replicas.
+    # Returns how many people changed in each replica (all of them, not
+    # just the live ones).
+    def set_state(self, state, mask, new_state):
+        replica = np.nonzero(mask)[0]
+        before = np.bincount(replica * len(STATE_NAMES) + state[mask], minlength=len(self.live) * len(STATE_NAMES))
+        before = before.reshape(len(self.live), len(STATE_NAMES))
+        changed = before.sum(axis=1)
+        self.tally[self.live] -= before
+        self.tally[self.live, new_state] += changed
+        state[mask] = new_state
+        counts = np.zeros(self.replicas, dtype=np.int64)
+        counts[self.live] = changed
+        return counts
+
+    # Same as VectorRegion.spread, with each replica's own pressure_kernel
+    def spread(self, pressure, mask, sign):
+        replica, rows, cols = np.nonzero(mask)
+        if len(rows) == 0:
+            return
+        kernels = self.kernels[self.live[replica]]
+        for dr in range(-3, 4):
+            for dc in range(-3, 4):
+                if dr != 0 or dc != 0:
+                    pressure[replica, rows + 3 + dr, cols + 3 + dc] += sign * kernels[:, dr + 3, dc + 3]
+
+    # Simulates one day of every replica that is still spreading
+    def step(self):
         self.clock += 1
-        self.master.title("Pandemic Day " + str(self.clock))
-        dict_count = {
-            "infected": 0,
-            "symptomatic": 0,
-            "recovered": 0,
-            "dead": 0,
-            "susceptable": 0,
-            }
-        # Call the update_grid method to go through each person object and 
-        # update their status, move around, etc...
-        self.update_grid()
+        self.new_infections = np.zeros(self.replicas, dtype=np.int64)
+        self.new_deaths = np.zeros(self.replicas, dtype=np.int64)
+        self.live = np.flatnonzero(self.spreading)
+        self.params = Parameters(height=self.height, width=self.width,
+                                 **{name: values[self.live] for name, values in self.columns.items()})
+        if len(self.live) == self.replicas:
+            self.update_area(self.cells, self.days, 0, 0)
+        else:
+            cells = self.cells[self.live]
+            days = self.days[self.live]
+            self.update_area(cells, days, 0, 0)
+            self.cells[self.live] = cells
+            self.days[self.live] = days
+        self.replica_days += len(self.live)
+
+        # Same as BaseRegion.step, for each replica
+        symptomatic = self.tally[:, SYMPTOMATIC]
+        spreading = self.spreading & ((self.tally[:, INFECTED] > 0) | (symptomatic > 0))
+        peak = spreading & (symptomatic > self.maxsymp)
+        self.maxsymp[peak] = symptomatic[peak]
+        self.peak_day[peak] = self.clock
+        self.days_run[self.live] = self.clock
+        self.spreading = spreading
+
+    # Runs until every replica is over (or for max_days days), and returns a
+    # summary of each replica like runReplica's
+    def run(self, max_days=None):
+        while self.spreading.any() and (max_days is None or self.clock < max_days):
+            self.step()
+        return self.summaries()
+
+    count_states = singleRegionOnly("count_states")
+    add_observer = singleRegionOnly("add_observer")
+    finish = singleRegionOnly("finish")
+    update_loop = singleRegionOnly("update_loop")
+    update_grid = singleRegionOnly("update_grid")
+    save = singleRegionOnly("save")
+    checkpoint_arrays = singleRegionOnly("checkpoint_arrays")
+    state_grid = singleRegionOnly("state_grid")
+
+    def summaries(self):
+        total_people = np.maximum(self.tally[:, EMPTY + 1:].sum(axis=1), 1)
+        return [{"settings": params.as_dict(),
+                 "seed": self.seeds[replica],
+                 "maxsymp": int(self.maxsymp[replica]),
+                 "recovered": float(self.tally[replica, RECOVERED] / total_people[replica] * 100),
+                 "dead": float(self.tally[replica, DEAD] / total_people[replica] * 100),
+                 "days": int(self.days_run[replica]),
+                 "peak_day": int(self.peak_day[replica])}
+                for replica, params in enumerate(self.params_list)]
+
+# Runs replicas runs of params (or the settings at the top of the file) as
+# one EnsembleRegion, and prints the throughput in replica-days per second
+# next to doing the same runs one VectorRegion at a time (for the first
+# compare of them).  Returns the summaries.
+def benchmarkEnsemble(replicas=200, params=None, seed=0, compare=20):
+    params = params or Parameters()
+    seeds = [seed + replica for replica in range(replicas)]
+    start = time.perf_counter()
+    ensemble = EnsembleRegion([params] * replicas, seeds)
+    summaries = ensemble.run()
+    elapsed = time.perf_counter() - start
+    print("Ensemble: {} replica-days in {:0.2f}s, {:0.0f} replica-days/s".format(
+        ensemble.replica_days, elapsed, ensemble.replica_days / elapsed))
+    start = time.perf_counter()
+    replica_days = 0
+    for replica in range(min(compare, replicas)):
+        region = VectorRegion(params, seeds[replica])
+        region.update_loop(False)
+        replica_days += region.clock
+    elapsed = time.perf_counter() - start
+    print("One at a time: {} replica-days in {:0.2f}s, {:0.0f} replica-days/s".format(
+        replica_days, elapsed, replica_days / elapsed))
+    return summaries
+
+# Runs a Region (either engine) day by day with a plain loop, so that even
+# very long pandemics use no extra stack or memory per day.  It can stop
+# early: after max_days days, or as soon as any of the stop_conditions
+# (functions taking the region and that day's dict_count) returns True.
+# reason says why it stopped: "over" when nobody is contagious any more,
+# "max_days" or "stopped".  Every function in on_finish is called with the
+# driver once it stops.
+class SimulationDriver:
+    def __init__(self, region, max_days=None, stop_conditions=None, on_finish=None, report=False):
+        self.region = region
+        self.max_days = max_days
+        self.stop_conditions = list(stop_conditions or [])
+        self.on_finish = list(on_finish or [])
+        # Print the results (like the visual run does) once it's over
+        self.report = report
+        self.dict_count = None
+        self.done = False
+        self.reason = None
+
+    # Simulates one day, then checks whether it's time to stop
+    def advance(self):
+        if self.done:
+            return
+        self.dict_count = self.region.step()
+        if not self.region.is_spreading(self.dict_count):
+            self.stop("over")
+        elif self.max_days is not None and self.region.clock >= self.max_days:
+            self.stop("max_days")
+        else:
+            for condition in self.stop_conditions:
+                if condition(self.region, self.dict_count):
+                    self.stop("stopped")
+                    break
+
+    def stop(self, reason):
+        self.done = True
+        self.reason = reason
+        if self.report:
+            printResults(self.region.maxsymp, self.dict_count)
+        self.region.finish(self.dict_count)
+        for callback in self.on_finish:
+            callback(self)
+
+    # Runs as fast as possible until it stops, and returns the last day's
+    # dict_count
+    def run(self):
+        while not self.done:
+            self.advance()
+        return self.dict_count
+
+    # Runs as many days as fit in budget seconds (always at least one).
+    # Returns whether it has stopped.
+    def run_for(self, budget):
+        start = time.perf_counter()
+        while not self.done:
+            self.advance()
+            if time.perf_counter() - start >= budget:
+                break
+        return self.done
+
+    # For visual runs: every interval_ms milliseconds, the Tk widget calls
+    # back to run as many days as fit in budget_ms, then hands control back
+    # to the window so that it stays responsive.
+    def run_in_window(self, widget, budget_ms=15, interval_ms=1):
+        def tick():
+            if not self.run_for(budget_ms / 1000):
+                widget.after(interval_ms, tick)
+        widget.after(interval_ms, tick)
+
+# Observer that shows the grid in a window.  tkinter is only imported once
+# one of these is made, so that headless runs (and importing this file) never
+# need a display.  The painting itself is up to CanvasView and ImageView.
+# How long each repaint takes is kept, and shown in the window title, so that
+# you can pick whichever is faster for your grid.
+class WindowView:
+    def __init__(self, region):
+        import tkinter
+        self.tkinter = tkinter
+        height, width = region.state_grid().shape
+        # Need a "master" window.  tkinter.Tk is a class that makes and 
+        # controls an on-screen window for us.
+        self.master = tkinter.Tk()
         
+        # Update the window title (at top of window) to show time
+        self.master.title("Pandemic Day " + str(region.clock))
+
+        # Create a Canvas object on the window.  The beauty of abstraction
+        # is that you don't have to understand what this really means to 
+        # be able to use it!  (A "canvas" is an object for putting other
+        # visible objects on, so they show up on the screen.)
+        self.canvas = tkinter.Canvas(self.master, width=width*CELL_PIXEL_SIZE, height=height*CELL_PIXEL_SIZE)
+        self.canvas.pack()
+
+        # Seconds taken by the last 100 repaints
+        self.frame_times = collections.deque(maxlen=100)
+
+    # Average repaint time so far, in milliseconds
+    def frame_time(self):
+        if not self.frame_times:
+            return 0.0
+        return sum(self.frame_times) / len(self.frame_times) * 1000
+
+    def day_finished(self, region, dict_count):
         # Setting Screen_update_frequency (at top) to 5 or 10 will make it run
         # (slightly) faster, for large simulations, but then you can't see
         # the daily changes
-        if self.clock % SCREEN_UPDATE_FREQUENCY == 0:
-            self.update_canvas_grid()
-        
-        
-        #Code to count state of each person
-        for row in range(HEIGHT):
-            for col in range(WIDTH):
-                if self.grid[row][col] != "empty":
-                    dict_count[self.grid[row][col].state] += 1      
-        
-        #Call to plot graph on each day
-        self.plotSIRDgraph(dict_count)
-        
-        # This function will ask the canvas to call the update_loop function
-        # again in 10 milliseconds.  It's a GUI way of entering an infinite 
-        # loop.  If you want to exit the program after a while, put this line 
-        # in an if statement so that it only runs while the clock is less than
-        # some amount, or while there are still infected people, etc...       
-        # While loop that finishes once there are no infected
-        if dict_count["infected"] or dict_count["symptomatic"] > 0:
-            if dict_count["symptomatic"] > self.maxsymp:
-                self.maxsymp = dict_count["symptomatic"]
-            if runCanvas:
-                self.canvas.after(10, self.update_loop())
+        if region.clock % SCREEN_UPDATE_FREQUENCY == 0:
+            start = time.perf_counter()
+            self.update_canvas_grid(region.state_grid())
+            self.canvas.update()
+            self.frame_times.append(time.perf_counter() - start)
+        self.master.title("Pandemic Day {} ({:.1f} ms per frame)".format(region.clock, self.frame_time()))
+
+    def finished(self, region, dict_count):
+        print("Drawing took {:.1f} ms per frame ({})".format(self.frame_time(), type(self).__name__))
+        self.master.withdraw()
+
+# Draws the grid as one canvas rectangle per cell, like the original version,
+# but only repaints the cells that have changed since the last frame.  Every
+# itemconfig is a round trip to Tk, so this matters more than anything else
+# once the grid gets big.
+class CanvasView(WindowView):
+    def __init__(self, region):
+        WindowView.__init__(self, region)
+        height, width = region.state_grid().shape
+            
+        # A parallel grid (2-D list) for storing "canvas rectangle" objects.
+        # Again, you don't need to understand this part very well to use it.
+        # It will paint each "cell" on the screen
+        self.canvas_grid = []
+        for row in range(height):
+            self.canvas_grid.append([])
+            for col in range(width):
+                rectangle = self.canvas.create_rectangle(col*CELL_PIXEL_SIZE,row*CELL_PIXEL_SIZE,\
+                    (col+1)*CELL_PIXEL_SIZE,(row+1)*CELL_PIXEL_SIZE, fill="grey", outline="black")
+                self.canvas_grid[row].append(rectangle)
+
+        # The state code each rectangle is showing right now (-1 for none yet)
+        self.shown = np.full((height, width), -1, dtype=np.int8)
+        self.canvas.update()
+
+    def update_canvas_grid(self, codes):
+        # This function goes through each cell of the grid that has changed
+        # and paints the associated rectangle the color of whatever is in it.
+        rows, cols = np.nonzero(codes != self.shown)
+        for row, col in zip(rows.tolist(), cols.tolist()):
+            color = STATE_COLORS[codes[row, col]]
+            # Now that I know what color, I can update the "rectangle" object
+            # I created in the __init__ method to show up that color on 
+            # the canvas.  You don't need to understand this part to use it.
+            self.canvas.itemconfig(self.canvas_grid[row][col], \
+                              fill=color, outline=color)
+        self.shown[rows, cols] = codes[rows, cols]
+
+# Draws the grid as a single image with one pixel per cell, blown up by
+# CELL_PIXEL_SIZE.  There are no per-cell canvas items at all: a frame is one
+# bulk put of the rows that changed, plus one zoomed copy, which is what
+# makes grids of 500 x 500 and up watchable.
+class ImageView(WindowView):
+    def __init__(self, region):
+        WindowView.__init__(self, region)
+        height, width = region.state_grid().shape
+        self.cells = self.tkinter.PhotoImage(width=width, height=height)
+        self.zoomed = self.tkinter.PhotoImage(width=width*CELL_PIXEL_SIZE, height=height*CELL_PIXEL_SIZE)
+        self.canvas.create_image(0, 0, image=self.zoomed, anchor="nw")
+        self.shown = np.full((height, width), -1, dtype=np.int8)
+        self.canvas.update()
+
+    def update_canvas_grid(self, codes):
+        rows = np.flatnonzero((codes != self.shown).any(axis=1))
+        if len(rows) == 0:
+            return
+        # Tk takes the pixels as "{#rrggbb #rrggbb ...} {...}", a row at a
+        # time.  Only the block of rows from the first to the last changed
+        # one is sent.
+        first = rows[0]
+        last = rows[-1] + 1
+        colors = np.array(STATE_HEX_COLORS)[codes[first:last]]
+        data = " ".join("{" + " ".join(row) + "}" for row in colors.tolist())
+        self.cells.put(data, to=(0, int(first)))
+        self.zoomed.tk.call(self.zoomed.name, "copy", self.cells.name, "-zoom", CELL_PIXEL_SIZE, CELL_PIXEL_SIZE)
+        self.shown[first:last] = codes[first:last]
+
+# Makes the window for a visual run, whichever kind RENDER_MODE names
+def createView(region):
+    if RENDER_MODE == "image":
+        return ImageView(region)
+    return CanvasView(region)
+
+# One day of a run in a background process, as sent to the window: the
+# day, the grid as state codes and the day's DayStats.  It has a clock and
+# a state_grid() like a region, which is all the views look at, so they can
+# draw it just the same.
+class Frame:
+    def __init__(self, clock, codes, stats):
+        self.clock = clock
+        self.codes = codes
+        self.stats = stats
+
+    def state_grid(self):
+        return self.codes
+
+# Observer, in the background process, that sends the days to the window.
+# If the window hasn't taken the last few yet (the queue is full), the day
+# is just skipped rather than waited for, so drawing never slows the
+# simulation down.
+class FrameSender:
+    def __init__(self, frames):
+        self.frames = frames
+        self.skipped = 0
+
+    def day_finished(self, region, dict_count):
+        if region.clock % SCREEN_UPDATE_FREQUENCY != 0:
+            return
+        if self.frames.full():
+            self.skipped += 1
+            return
+        try:
+            self.frames.put_nowait(("frame", region.clock, np.array(region.state_grid()), region.stats))
+        except queue.Full:
+            self.skipped += 1
+
+    def finished(self, region, dict_count):
+        pass
+
+# The background process of a BackgroundRun.  Sends the starting grid,
+# then the days (see FrameSender), and at the end ("done", the final frame,
+# maxsymp, dict_count, the recorded series, and how many days were skipped),
+# or ("error", the traceback) if it fails.
+def runInBackground(params, seed, engine, frontier, frames):
+    try:
+        region = createRegion(False, params, seed, engine, frontier)
+        recorder = TimeSeriesRecorder()
+        sender = FrameSender(frames)
+        region.add_observer(recorder)
+        region.add_observer(sender)
+        frames.put(("frame", region.clock, np.array(region.state_grid()), region.stats))
+        dict_count = region.update_loop(False)
+        frames.put(("done", ("frame", region.clock, np.array(region.state_grid()), region.stats),
+                    region.maxsymp, dict_count, recorder.data[:recorder.days], sender.skipped))
+        if hasattr(region, "close"):
+            region.close()
+    except Exception:
+        import traceback
+        frames.put(("error", traceback.format_exc()))
+
+# A visual run where the simulation happens in its own process, so that a
+# slow day never freezes the window and drawing never holds up the
+# simulation.  The days come back through a queue of at most queue_size
+# frames, and every frame_ms milliseconds the window draws the newest one
+# and throws away any older ones it didn't get to.  run() shows the window
+# until the pandemic is over (or the window is closed), prints the results
+# and returns a TimeSeriesRecorder with every day's DayStats.
+class BackgroundRun:
+    def __init__(self, params=None, seed=None, engine=None, frontier=None, queue_size=4, frame_ms=None):
+        import multiprocessing
+        if frontier is None:
+            frontier = FRONTIER
+        self.frame_ms = frame_ms or max(1, 1000 // FRAME_RATE)
+        self.frames = multiprocessing.Queue(queue_size)
+        # (Not a daemon, since the "tiled" engine starts processes of its own)
+        self.process = multiprocessing.Process(target=runInBackground,
+                                               args=(params or Parameters(), seed, engine or ENGINE, frontier, self.frames))
+        self.process.start()
+        self.recorder = TimeSeriesRecorder()
+        self.dropped = 0
+        self.done = False
+        # What went wrong, if anything.  Raising it from poll() wouldn't get
+        # anywhere, since Tk just prints errors from its callbacks and
+        # carries on, so it's kept here for run() to raise.
+        self.error = None
+
+        message = self.next_message()
+        if message[0] == "error":
+            self.close()
+            raise RuntimeError("The simulation failed:\n" + message[1])
+        self.frame = Frame(*message[1:])
+        self.view = createView(self.frame)
+        self.view.master.protocol("WM_DELETE_WINDOW", self.close)
+
+    # How often next_message checks that the background process is still
+    # there, in seconds
+    liveness_check = .5
+
+    # Waits for the next message from the background process.  If it dies
+    # without sending one (killed for running out of memory, say), raises
+    # instead of waiting forever.
+    def next_message(self):
+        while True:
+            try:
+                return self.frames.get(timeout=self.liveness_check)
+            except queue.Empty:
+                if self.process.exitcode is not None:
+                    # It may have sent something just before it went
+                    try:
+                        return self.frames.get(timeout=self.liveness_check)
+                    except queue.Empty:
+                        raise self.died()
+
+    # Stops everything, and returns the error for a background process
+    # that ended without saying it was done
+    def died(self):
+        self.close()
+        return RuntimeError("The simulation stopped without finishing (exit code {})".format(self.process.exitcode))
+
+    # Called every frame_ms by the window: takes everything waiting in the
+    # queue, and draws just the newest frame
+    def poll(self):
+        newest = None
+        # (Checked before emptying the queue, so that anything it sent
+        # before it stopped has been read.)
+        stopped = self.process.exitcode is not None
+        while not self.done:
+            try:
+                message = self.frames.get_nowait()
+            except queue.Empty:
+                break
+            if message[0] == "frame":
+                if newest is not None:
+                    self.dropped += 1
+                newest = message
+            elif message[0] == "done":
+                self.finish(*message[1:])
+                return
             else:
-                self.canvas.after(10, self.update_loop(False))
-        elif not runCanvas:
+                self.error = RuntimeError("The simulation failed:\n" + message[1])
+                self.close()
+                return
+        if self.done:
             return
+        if newest is not None:
+            self.frame = Frame(*newest[1:])
+            self.view.day_finished(self.frame, None)
+        if stopped:
+            self.error = self.died()
+            return
+        self.view.master.after(self.frame_ms, self.poll)
+
+    # Draws the last day, fills in the recorder and prints the results
+    def finish(self, last, maxsymp, dict_count, series, skipped):
+        self.frame = Frame(*last[1:])
+        self.view.day_finished(self.frame, dict_count)
+        self.recorder = TimeSeriesRecorder(max(len(series), 1))
+        self.recorder.data[:len(series)] = series
+        self.recorder.days = len(series)
+        printResults(maxsymp, dict_count)
+        print("{} days were skipped in the background and {} dropped by the window".format(skipped, self.dropped))
+        self.view.finished(self.frame, dict_count)
+        self.close(wait=5)
+
+    # Stops the background process (giving it wait seconds to finish by
+    # itself) and the window's mainloop
+    def close(self, wait=0):
+        self.done = True
+        self.process.join(wait)
+        if self.process.is_alive():
+            self.process.terminate()
+            self.process.join()
+        if hasattr(self, "view"):
+            self.view.master.quit()
+
+    # Shows the window until the run is over, and raises whatever stopped it
+    # if it didn't finish
+    def run(self):
+        self.view.master.after(self.frame_ms, self.poll)
+        self.view.master.mainloop()
+        if self.error is not None:
+            raise self.error
+        return self.recorder
+
+# Observer that records each day's DayStats into columns of one growable
+# NumPy array (doubling in size when it fills up), rather than drawing
+# anything per day.  The SIRD graph is drawn once from that with plot(), or,
+# with live=True, kept up to date while it runs by moving the lines' data
+# every live_every days.  The series can be saved with save() (.csv, .npz or
+# .parquet), and with stream_path every day is also written to a CSV file as
+# it happens.  matplotlib is only imported when something gets drawn.
+class TimeSeriesRecorder:
+    columns = DayStats._fields
+
+    def __init__(self, capacity=256, live=False, live_every=5, stream_path=None):
+        self.data = np.zeros((capacity, len(self.columns)), dtype=np.int64)
+        self.days = 0
+        self.live = live
+        self.live_every = live_every
+        self.lines = None
+        self.stream = None
+        if stream_path is not None:
+            self.stream = open(stream_path, "w")
+            self.stream.write(",".join(self.columns) + "\n")
+
+    # The recorded values of one DayStats field, e.g. series("dead")
+    def series(self, name):
+        return self.data[:self.days, self.columns.index(name)]
+
+    def day_finished(self, region, dict_count):
+        if self.days == len(self.data):
+            bigger = np.zeros((2 * len(self.data), len(self.columns)), dtype=np.int64)
+            bigger[:self.days] = self.data
+            self.data = bigger
+        self.data[self.days] = region.stats
+        self.days += 1
+        if self.stream is not None:
+            self.stream.write(",".join(str(value) for value in region.stats) + "\n")
+        if self.live and self.days % self.live_every == 0:
+            self.plot()
+            self.lines[0].figure.canvas.draw_idle()
+            self.lines[0].figure.canvas.flush_events()
+
+    def finished(self, region, dict_count):
+        if self.stream is not None:
+            self.stream.close()
+            self.stream = None
+        if self.live:
+            self.plot()
+
+    # The four SIRD curves: susceptable, infectious, recovered and dead
+    def sird(self):
+        return [self.series("susceptible"),
+                self.series("infected") + self.series("symptomatic"),
+                self.series("recovered"),
+                self.series("dead")]
+
+    # Draws (or, once drawn, updates) one line per SIRD curve
+    def plot(self):
+        import matplotlib.pyplot as plt
+        days = self.series("day")
+        if self.lines is None:
+            self.lines = []
+            for values, color, label in zip(self.sird(), ["b", "r", "g", "y"],
+                                            ["susceptable", "infectious", "recovered", "dead"]):
+                self.lines.append(plt.plot(days, values, c=color, label=label)[0])
+            plt.legend(loc="best")
         else:
-            print("The max number of symptomatics at one time was {} people".format(self.maxsymp))
-            total_people = dict_count["recovered"] + dict_count["dead"] + dict_count["susceptable"]
-            print("{:0.2f}% of people recovered from the pandemic and {:0.2f}% of people died from the pandemic".format(
-            dict_count["recovered"]/total_people*100, dict_count["dead"]/total_people*100))
-            self.master.withdraw()     
-            
-# studyParameter function that studies the cases for different values of POPULATION_DENSITY and SYMPTON_CHANCE. 
-# Implemented runCanvas argument to Region constructor and some methods in order to run regions in background
-def studyParameter():
-    global POPULATION_DENSITY
-    global SYMPTON_CHANCE
-    global SCREEN_UPDATE_FREQUENCY
-    #Speed up background simulations by increasing frequency
-    SCREEN_UPDATE_FREQUENCY = 100
+            for line, values in zip(self.lines, self.sird()):
+                line.set_data(days, values)
+            axes = self.lines[0].axes
+            axes.relim()
+            axes.autoscale_view()
+
+    # Saves the series, as a CSV, NPZ or Parquet file depending on the
+    # path's extension.  Parquet needs pyarrow.
+    def save(self, path):
+        if path.endswith(".npz"):
+            np.savez(path, **{name: self.series(name) for name in self.columns})
+        elif path.endswith(".parquet"):
+            import pyarrow
+            import pyarrow.parquet
+            table = pyarrow.table({name: self.series(name) for name in self.columns})
+            pyarrow.parquet.write_table(table, path)
+        else:
+            np.savetxt(path, self.data[:self.days], fmt="%d", delimiter=",",
+                       header=",".join(self.columns), comments="")
+
+# Reads a file written by BaseRegion.save, as a dict of arrays.  The grids
+# aren't read in: they're memory maps straight into the file (np.savez
+# doesn't compress, so they sit in it as they are), and only the rows that
+# get used are read, so restoring a chunked run doesn't need the whole grid
+# in memory.  The file has to stay put while the dict is in use.
+def loadCheckpoint(path):
+    arrays = {}
+    with np.load(path) as checkpoint, open(path, "rb") as raw:
+        for name in checkpoint.files:
+            member = checkpoint.zip.getinfo(name + ".npy")
+            with checkpoint.zip.open(member) as data:
+                if np.lib.format.read_magic(data) == (1, 0):
+                    shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(data)
+                else:
+                    shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(data)
+                header_size = data.tell()
+            if len(shape) < 2 or member.compress_type != zipfile.ZIP_STORED or dtype.hasobject:
+                arrays[name] = checkpoint[name]
+                continue
+            # Where the member's data starts: after its local zip header
+            # (whose name and extra field lengths can differ from the ones in
+            # the directory) and the .npy header
+            raw.seek(member.header_offset)
+            name_size, extra_size = struct.unpack("<HH", raw.read(30)[26:])
+            offset = member.header_offset + 30 + name_size + extra_size + header_size
+            arrays[name] = np.memmap(path, dtype, "r", offset, shape, "F" if fortran_order else "C")
+    return arrays
+
+# The Parameters a checkpoint was saved with
+def checkpointParameters(checkpoint):
+    return Parameters(**json.loads(str(checkpoint["settings"])))
+
+# Carries on a run saved with BaseRegion.save, with the same engine, from the
+# day it was saved.  checkpoint is the file's path, or what loadCheckpoint
+# read from it.  changes are settings to change from here on (see
+# Parameters.replace), e.g. restoreRegion(path, mortality_rate=.05), and a
+# seed gives the rest of the run different random numbers.  Without either,
+# the run carries on exactly as it would have.  If the run had a
+# TimeSeriesRecorder, the restored one gets a new one with the series so far.
+def restoreRegion(checkpoint, seed=None, **changes):
+    if not isinstance(checkpoint, dict):
+        checkpoint = loadCheckpoint(checkpoint)
+    params = checkpointParameters(checkpoint).replace(**changes)
+    if (params.width, params.height) != (checkpoint["state"].shape[1], checkpoint["state"].shape[0]):
+        raise ValueError("A restored run can't change the width or height")
+    if seed is None:
+        seed = int(checkpoint["seed"])
+    engine = str(checkpoint["engine"])
+    if engine == "vector":
+        region = VectorRegion(params, seed, bool(checkpoint["frontier"]), checkpoint)
+    elif engine == "tiled":
+        region = TiledRegion(params, seed, WORKERS, checkpoint)
+    elif engine == "chunked":
+        region = ChunkedRegion(params, seed, bool(checkpoint["frontier"]), checkpoint=checkpoint)
+    else:
+        region = Region(params, seed, bool(checkpoint["frontier"]), checkpoint)
+    if "series" in checkpoint:
+        recorder = TimeSeriesRecorder(max(2 * len(checkpoint["series"]), 256))
+        recorder.days = len(checkpoint["series"])
+        recorder.data[:recorder.days] = checkpoint["series"]
+        region.add_observer(recorder)
+    return region
+
+# A restored run (see restoreRegion) for each of scenarios, dicts of
+# settings to change (and maybe a "seed"), all carrying on from the same
+# checkpoint, e.g. to see what happens if the mortality rate goes up on day
+# 30.  The file is only read once.  Unless a scenario has its own seed, they
+# all get the same random numbers, so the differences between them come from
+# the changes rather than luck.
+def forkRegions(path, scenarios):
+    checkpoint = loadCheckpoint(path)
+    return [restoreRegion(checkpoint, **scenario) for scenario in scenarios]
+
+# Makes a Region using whichever engine ENGINE names (with FRONTIER unless
+# frontier says otherwise).  "ensemble" only changes how sweeps run, and a
+# single run of it is a VectorRegion.  With runCanvas, it
+# also gets a window showing the grid and the SIRD graph.
+def createRegion(runCanvas=True, params=None, seed=None, engine=None, frontier=None):
+    if frontier is None:
+        frontier = FRONTIER
+    if (engine or ENGINE) in ["vector", "ensemble"]:
+        region = VectorRegion(params, seed, frontier)
+    elif (engine or ENGINE) == "tiled":
+        if frontier:
+            raise ValueError("The tiled engine can't follow the frontier; each worker runs all of its rows")
+        region = TiledRegion(params, seed, WORKERS)
+    elif (engine or ENGINE) == "chunked":
+        region = ChunkedRegion(params, seed, frontier)
+    else:
+        region = Region(params, seed, frontier)
+    if runCanvas:
+        region.add_observer(createView(region))
+        region.add_observer(TimeSeriesRecorder())
+    return region
+
+# One run of a parameter sweep.  job is (settings, replica, seed, engine),
+# where settings is a full Parameters.as_dict().  Everything the run needs is
+# passed in, so that it can run in another process.
+def runReplica(job):
+    settings, replica, seed, engine = job
+    region = createRegion(False, Parameters(**settings), seed, engine)
+    dict_count = region.update_loop(False)
+    total_people = max(sum(dict_count.values()), 1)
+    return {
+        "settings": settings,
+        "replica": replica,
+        "seed": seed,
+        "engine": engine,
+        "maxsymp": region.maxsymp,
+        "recovered": dict_count["recovered"] / total_people * 100,
+        "dead": dict_count["dead"] / total_people * 100,
+        "days": region.clock,
+        }
+
+# Several runs of a parameter sweep at once, as an EnsembleRegion.  jobs
+# are like runReplica's, and all need the same width and height.  Gives
+# the same results as runReplica with the "vector" engine.
+def runEnsemble(jobs):
+    ensemble = EnsembleRegion([Parameters(**settings) for settings, replica, seed, engine in jobs],
+                              [seed for settings, replica, seed, engine in jobs])
+    results = ensemble.run()
+    for result, (settings, replica, seed, engine) in zip(results, jobs):
+        result["settings"] = settings
+        result["replica"] = replica
+        result["seed"] = seed
+        result["engine"] = engine
+    return results
+
+# How many runs go in each EnsembleRegion when a sweep uses the "ensemble"
+# engine
+ENSEMBLE_SIZE = 64
+
+# A name for a set of settings that is the same in every process and every
+# time the program runs, used to match up results and to make seeds.
+def settingsKey(settings):
+    return json.dumps(settings, sort_keys=True)
+
+# The seed for one replica of one set of settings.  It only depends on the
+# settings, not on the order runs happen in, so resuming a sweep (or running
+# it with a different number of processes) gives the same runs.
+def replicaSeed(base_seed, settings, replica):
+    key = zlib.crc32(settingsKey(settings).encode())
+    return int(np.random.SeedSequence([base_seed, key, replica]).generate_state(1)[0])
+
+# Reads the finished runs back out of a sweep's results file (one JSON
+# record per line).  A half-written last line from an interrupted sweep is
+# skipped, and that run just happens again.
+def loadResults(results_path):
+    results = []
+    if results_path is None or not os.path.exists(results_path):
+        return results
+    with open(results_path) as results_file:
+        for line in results_file:
+            try:
+                results.append(json.loads(line))
+            except ValueError:
+                pass
+    return results
+
+# Mean, variance and 95% confidence interval (normal approximation) of
+# some numbers
+def describe(values):
+    values = np.asarray(values, dtype=float)
+    mean = float(values.mean())
+    variance = float(values.var(ddof=1)) if len(values) > 1 else 0.0
+    half_width = 1.96 * math.sqrt(variance / len(values))
+    return {"mean": mean, "variance": variance, "ci95": (mean - half_width, mean + half_width)}
+
+# Runs every point (a dict of Parameters settings to change, e.g.
+# {"population_density": .5}) replicas times, each with its own seed, spread
+# over workers processes (all cores by default).  If results_path is given,
+# every finished run is added to that file straight away, and runs already
+# in it are skipped, so an interrupted sweep picks up where it left off.
+# Only runs made with the same engine and base_seed count; anything else in
+# the file is left out of the summaries and run again.  Returns a summary
+# per point: its settings, how many replicas, and describe() of the max
+# symptomatics, recovered % and dead %.  With the
+# "ensemble" engine, runs with the same width and height are done
+# ENSEMBLE_SIZE at a time (see runEnsemble).
+def sweep(points, replicas=5, results_path=None, workers=None, engine=None, base_seed=0, progress=None):
+    engine = engine or ENGINE
+    # Fill in the rest of the settings here, since other processes won't
+    # see any changes made to the settings at the top of the file.
+    points = [Parameters(**point).as_dict() for point in points]
+    results = [result for result in loadResults(results_path)
+               if result.get("engine") == engine
+               and result["seed"] == replicaSeed(base_seed, result["settings"], result["replica"])]
+    finished = {(settingsKey(result["settings"]), result["replica"]) for result in results}
+    jobs = []
+    for settings in points:
+        for replica in range(replicas):
+            if (settingsKey(settings), replica) not in finished:
+                jobs.append((settings, replica, replicaSeed(base_seed, settings, replica), engine))
+
+    # What each process is given to do: a batch of runs for an ensemble,
+    # otherwise one run at a time
+    if engine == "ensemble":
+        run = runEnsemble
+        by_size = {}
+        for job in jobs:
+            by_size.setdefault((job[0]["width"], job[0]["height"]), []).append(job)
+        tasks = [batch[start:start + ENSEMBLE_SIZE] for batch in by_size.values()
+                 for start in range(0, len(batch), ENSEMBLE_SIZE)]
+    else:
+        run = runReplica
+        tasks = jobs
+
+    results_file = None
+    if results_path is not None:
+        results_file = open(results_path, "a")
+        # Finish off a half-written line so the next record starts fresh
+        if results_file.tell() > 0:
+            with open(results_path, "rb") as previous:
+                previous.seek(-1, os.SEEK_END)
+                if previous.read() != b"\n":
+                    results_file.write("\n")
+    try:
+        if workers == 1:
+            outcomes = map(run, tasks)
+        else:
+            import concurrent.futures
+            pool = concurrent.futures.ProcessPoolExecutor(workers)
+            outcomes = (future.result() for future in
+                        concurrent.futures.as_completed([pool.submit(run, task) for task in tasks]))
+        for outcome in outcomes:
+            for result in (outcome if run is runEnsemble else [outcome]):
+                results.append(result)
+                if results_file is not None:
+                    results_file.write(json.dumps(result) + "\n")
+                    results_file.flush()
+                if progress is not None:
+                    progress(result)
+    finally:
+        if workers != 1:
+            pool.shutdown(cancel_futures=True)
+        if results_file is not None:
+            results_file.close()
+    return summarizeSweep(points, results)
+
+# Groups a sweep's results by point, see sweep()
+def summarizeSweep(points, results):
+    by_point = {}
+    for result in results:
+        by_point.setdefault(settingsKey(result["settings"]), []).append(result)
+    summaries = []
+    for settings in points:
+        runs = by_point.get(settingsKey(settings), [])
+        summary = {"settings": settings, "replicas": len(runs)}
+        if runs:
+            for name in ["maxsymp", "recovered", "dead"]:
+                summary[name] = describe([run[name] for run in runs])
+        summaries.append(summary)
+    return summaries
+
+# studyParameter function that studies the cases for different values of
+# POPULATION_DENSITY and SYMPTOM_CHANCE.  Each pair is run replicas times
+# with different seeds, in parallel (see sweep), and compared on the average
+# max number of symptomatics.
+def studyParameter(replicas=5, results_path=None, workers=None):
+    #Loading statements
+    print("Studying Parameters...")
+
+    points = []
+    for i in range(1,10):
+        for k in range(1,10):
+            points.append({"population_density": i/10, "symptom_chance": k/10})
+    summaries = sweep(points, replicas, results_path, workers)
+
     maxSymp = 0
     minSymp = 10000
     maxI = 0
     maxK = 0
     minI = 0
     minK = 0
-    index = 0
-    
-    #Loading statements
-    print("Studying Parameters...")
-    
-    for i in range(1,10):
-        #Checks each neighborhood
-        for k in range(1,10):
-            POPULATION_DENSITY = i/10
-            SYMPTON_CHANCE = k/10
-            n = Region(False)
-            n.update_loop(False)
-            print("The maximum symptomatics for population density {} and sympton chance {} is {}".format(i/10,k/10,n.maxsymp))
-            if n.maxsymp > maxSymp:
-                maxSymp = n.maxsymp
-                maxI = i/10
-                maxK = k/10
-            if n.maxsymp < minSymp:
-                minSymp = n.maxsymp
-                minI = i/10
-                minK = i/10
+    for summary in summaries:
+        i = summary["settings"]["population_density"]
+        k = summary["settings"]["symptom_chance"]
+        symp = summary["maxsymp"]
+        print("The maximum symptomatics for population density {} and symptom chance {} is {:.1f} (95% CI {:.1f} to {:.1f})".format(
+            i, k, symp["mean"], symp["ci95"][0], symp["ci95"][1]))
+        if symp["mean"] > maxSymp:
+            maxSymp = symp["mean"]
+            maxI = i
+            maxK = k
+        if symp["mean"] < minSymp:
+            minSymp = symp["mean"]
+            minI = i
+            minK = k
     #Print results
-    print("The max amount of symptomatics are: {}".format(maxSymp))
-    print("The Population Density for the max is {} and the Sympton Chance for the max is {}".format(maxI,maxK))
-    print("The Population Density for the min is {} and the Sympton Chance for the min is {}".format(minI,minK))
+    print("The max amount of symptomatics are: {:.1f}".format(maxSymp))
+    print("The Population Density for the max is {} and the Symptom Chance for the max is {}".format(maxI,maxK))
+    print("The Population Density for the min is {} and the Symptom Chance for the min is {}".format(minI,minK))
+    return summaries
+
+# Runs replicas runs of each of points (population density, symptom chance)
+# as one EnsembleRegion, spending as few simulated days as it can:
+#   - a run stops as soon as its peak is settled: it's been falling for
+#     settle_days days and symptomatics are at most half the peak,
+#   - every horizon days (doubling each time), the points still running
+#     are ranked by their mean peak so far, and only the keep fraction at
+#     the top and the keep fraction at the bottom carry on (successive
+#     halving), along with any still below the lowest finished point,
+#     since they could still be the minimum.
+# Returns, per point, describe() of the peaks, whether it "finished" or
+# was "dropped" (in which case its peaks are only how high it got so far),
+# and how many replica-days it took altogether.
+def screenPoints(base, points, replicas, horizon, keep, settle_days, base_seed):
+    settings = [base.replace(population_density=d, symptom_chance=k).as_dict() for d, k in points]
+    ensemble = EnsembleRegion([Parameters(**each) for each in settings for replica in range(replicas)],
+                              [replicaSeed(base_seed, each, replica) for each in settings for replica in range(replicas)])
+    point_of = np.repeat(np.arange(len(points)), replicas)
+    dropped = np.zeros(len(points), dtype=bool)
+    contagious = ensemble.tally[:, INFECTED] + ensemble.tally[:, SYMPTOMATIC]
+    falling = np.zeros(ensemble.replicas, dtype=np.int64)
+    while ensemble.spreading.any():
+        while ensemble.spreading.any() and ensemble.clock < horizon:
+            ensemble.step()
+            before = contagious
+            contagious = ensemble.tally[:, INFECTED] + ensemble.tally[:, SYMPTOMATIC]
+            falling = np.where(contagious < before, falling + 1, 0)
+            settled = (falling >= settle_days) & (ensemble.tally[:, SYMPTOMATIC] * 2 <= ensemble.maxsymp)
+            ensemble.spreading &= ~settled
+
+        running = np.unique(point_of[ensemble.spreading])
+        if len(running) > 0:
+            means = np.bincount(point_of, weights=ensemble.maxsymp) / replicas
+            finished = np.setdiff1d(np.arange(len(points)), np.concatenate([running, np.flatnonzero(dropped)]))
+            lowest = means[finished].min() if len(finished) > 0 else -1
+            ranked = running[np.argsort(-means[running], kind="stable")]
+            kept = max(1, int(len(ranked) * keep))
+            hopeless = [point for point in ranked[kept:len(ranked) - kept] if means[point] >= lowest]
+            dropped[hopeless] = True
+            ensemble.spreading &= ~np.isin(point_of, hopeless)
+        horizon *= 2
+
+    return {point: {"maxsymp": describe(ensemble.maxsymp[point_of == i]),
+                    "status": "dropped" if dropped[i] else "finished"}
+            for i, point in enumerate(points)}, ensemble.replica_days
+
+# An adaptive version of studyParameter: rather than running all 81 points,
+# it starts with a coarse grid (a step of .2) and, for each of levels
+# levels, halves the step and only adds points next to the highest and
+# lowest points so far, and halfway along wherever the outcome changes
+# sharply between neighbors (by more than sharp times the average change
+# between finished neighbors), which is where the thresholds are.  Each batch of points is run with
+# screenPoints.  Uses the NumPy engine.  Returns the max and min points,
+# the thresholds (the midpoints of the sharp changes at the finest step),
+# every point's results and the replica-days it took.
+def adaptiveStudy(replicas=8, levels=3, horizon=6, keep=0.25, sharp=2, settle_days=3, base_seed=0, params=None):
+    base = params or Parameters()
+    # Points are kept as whole numbers of fortieths, so that halving the
+    # step never runs into rounding
+    step = 8
+    coarse = range(4, 37, step)
+    todo = {(d, k) for d in coarse for k in coarse}
+    results = {}
+    replica_days = 0
+    for level in range(levels + 1):
+        todo = sorted(point for point in todo if point not in results)
+        if todo:
+            screened, days = screenPoints(base, [(d / 40, k / 40) for d, k in todo],
+                                          replicas, horizon, keep, settle_days, base_seed)
+            replica_days += days
+            for point in todo:
+                results[point] = screened[(point[0] / 40, point[1] / 40)]
+
+        means = {point: result["maxsymp"]["mean"] for point, result in results.items()}
+        finished = [point for point in results if results[point]["status"] == "finished"]
+        highest = max(means, key=means.get)
+        lowest = min(finished, key=means.get)
+        edges = [((d, k), neighbor) for (d, k) in finished for neighbor in [(d + step, k), (d, k + step)]
+                 if neighbor in finished]
+        changes = [abs(means[a] - means[b]) for a, b in edges]
+        sharp_edges = [edge for edge, change in zip(edges, changes) if change > sharp * np.mean(changes)]
+        if level == levels or step == 1:
+            break
+
+        step //= 2
+        todo = set()
+        for (d, k) in [highest, lowest]:
+            for dd in [-step, 0, step]:
+                for dk in [-step, 0, step]:
+                    if 4 <= d + dd <= 36 and 4 <= k + dk <= 36:
+                        todo.add((d + dd, k + dk))
+        for (d, k), (nd, nk) in sharp_edges:
+            todo.add(((d + nd) // 2, (k + nk) // 2))
+
+    thresholds = [((a[0] + b[0]) / 80, (a[1] + b[1]) / 80) for a, b in sharp_edges]
+    print("Studied {} points in {} replica-days".format(len(results), replica_days))
+    print("The max amount of symptomatics are: {:.1f}, at population density {} and symptom chance {}".format(
+        means[highest], highest[0] / 40, highest[1] / 40))
+    print("The min amount of symptomatics are: {:.1f}, at population density {} and symptom chance {}".format(
+        means[lowest], lowest[0] / 40, lowest[1] / 40))
+    print("The outcome changes sharply around (population density, symptom chance): " +
+          (", ".join("({:.3f}, {:.3f})".format(d, k) for d, k in thresholds) or "nowhere"))
+    return {"max": (highest[0] / 40, highest[1] / 40), "min": (lowest[0] / 40, lowest[1] / 40),
+            "thresholds": thresholds, "replica_days": replica_days,
+            "points": {(d / 40, k / 40): result for (d, k), result in results.items()}}
+
+# Times all of the Person.move calls of a few days of a run, with
+# Region.empty_count (looked up by Person.socialDistance, and kept up to
+# date by update_empty_count on every move) against a copy of the run that
+# counts the empty cells around each spot by looking at the grid instead
+# (the way Person.socialDistance used to) and doesn't keep empty_count at
+# all.  Both pick the same spots, so the two runs stay the same, which is
+# checked at the end.
+def benchmarkMovement(params=None, seed=0, days=3):
+    # Person.socialDistance, but counting by looking at the grid
+    def scanning_distance(person, empty_neighbors, step):
+        max_neighbors = 0
+        best_spots = []
+        for neighbor in empty_neighbors:
+            neighbor_count = person.region.count_empty_neighbors(neighbor[0], neighbor[1])
+            if neighbor_count > max_neighbors:
+                max_neighbors = neighbor_count
+                best_spots = [neighbor]
+            elif neighbor_count == max_neighbors:
+                best_spots.append(neighbor)
+        return best_spots[int(person.region.draws[MOVE + step][person.number] * len(best_spots))]
+
+    move = Person.move
+    seconds = [0.0]
+    moves = [0]
+    def timed_move(person, step):
+        start = time.perf_counter()
+        move(person, step)
+        seconds[0] += time.perf_counter() - start
+        moves[0] += 1
+
+    times = {}
+    grids = {}
+    social_distance = Person.socialDistance
+    Person.move = timed_move
+    try:
+        for way in ["scan", "map"]:
+            region = Region(params, seed)
+            if way == "scan":
+                Person.socialDistance = scanning_distance
+                region.update_empty_count = lambda old_row, old_col, new_row, new_col: None
+            seconds[0] = 0.0
+            moves[0] = 0
+            for day in range(days):
+                region.step()
+            Person.socialDistance = social_distance
+            times[way] = seconds[0]
+            grids[way] = region.state_grid()
+    finally:
+        Person.move = move
+        Person.socialDistance = social_distance
+    if not np.array_equal(grids["scan"], grids["map"]):
+        raise RuntimeError("Moving with empty_count ended up somewhere else than looking at the grid")
+    print("{} moves took {:0.3f}s looking at the grid and {:0.3f}s with empty_count, keeping it up to date included ({:0.1f}x faster)".format(
+        moves[0], times["scan"], times["map"], times["scan"] / times["map"]))
+    return times["scan"], times["map"]
+
+# Opt-in timing of where the days of a region go, phase by phase.  Making
+# one wraps the region's methods (see region_phases, and for the object
+# engine some of Person's too, which means every Region's people while it's
+# attached) so that every call is timed and counted.  A phase's time doesn't
+# include the phases it calls: Person.update's is just getting better,
+# developing symptoms, dying and rolling for catching it, since moving and
+# changing state are timed on their own.  The observers' day_finished (the
+# window, the graph, ...) are timed too, under their class names.  With
+# allocations on, tracemalloc also records the most memory allocated at once
+# each day, which slows everything down a lot.  Call detach() when done,
+# which puts the methods back.  A TiledRegion's days aren't broken down
+# into phases, since all of the work happens in its worker processes: it
+# only has "counting" and "other".
+class PhaseProfiler:
+    # Which phase the time of each method goes to, for the ones a region has
+    region_phases = {"update_grid": "other", "update_area": "other",
+                     "move_area": "movement", "move_step": "movement", "chunked_move_step": "movement",
+                     "update_health": "progression", "update_group": "progression",
+                     "chunked_groups": "progression",
+                     "spread": "infection pressure", "pressure_grid": "infection pressure",
+                     "spread_rows": "infection pressure",
+                     "cell_bits": "random numbers", "count_states": "counting"}
+    person_phases = {"update": "progression", "move": "movement", "become": "state changes"}
+
+    def __init__(self, region, allocations=False):
+        self.region = region
+        self.allocations = allocations
+        # One record per day: its number, how long it took, and the seconds
+        # and calls of each phase
+        self.days = []
+        self.phases = {}
+        # The time spent in the phases called by each phase being timed
+        self.stack = []
+
+        for name, phase in self.region_phases.items():
+            if hasattr(region, name):
+                setattr(region, name, self.timed(phase, getattr(region, name)))
+        self.observers = list(region.observers)
+        for observer in self.observers:
+            observer.day_finished = self.timed(type(observer).__name__, observer.day_finished)
+        self.person_methods = {}
+        if isinstance(region, Region):
+            for name, phase in self.person_phases.items():
+                self.person_methods[name] = Person.__dict__[name]
+                setattr(Person, name, self.timed(phase, self.person_methods[name]))
+        region.step = self.timed_day(self.timed("other", region.step))
+
+        self.started_tracing = allocations and not tracemalloc.is_tracing()
+        if self.started_tracing:
+            tracemalloc.start()
+
+    # function, but adding the time it takes to phase
+    def timed(self, phase, function):
+        def timed(*args, **kwargs):
+            self.stack.append(0.0)
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - start
+                inner = self.stack.pop()
+                if self.stack:
+                    self.stack[-1] += elapsed
+                totals = self.phases.setdefault(phase, {"seconds": 0.0, "calls": 0})
+                totals["seconds"] += elapsed - inner
+                totals["calls"] += 1
+        return timed
+
+    # step, but keeping a record of each day
+    def timed_day(self, step):
+        def timed_step():
+            self.phases = {}
+            if self.allocations:
+                tracemalloc.reset_peak()
+                before = tracemalloc.get_traced_memory()[0]
+            start = time.perf_counter()
+            dict_count = step()
+            day = {"day": self.region.clock, "seconds": time.perf_counter() - start, "phases": self.phases}
+            if self.allocations:
+                day["peak_bytes"] = tracemalloc.get_traced_memory()[1] - before
+            self.days.append(day)
+            return dict_count
+        return timed_step
+
+    # Puts the methods back as they were
+    def detach(self):
+        for name in list(self.region_phases) + ["step"]:
+            self.region.__dict__.pop(name, None)
+        for observer in self.observers:
+            observer.__dict__.pop("day_finished", None)
+        for name, method in self.person_methods.items():
+            setattr(Person, name, method)
+        self.person_methods = {}
+        if self.started_tracing:
+            tracemalloc.stop()
+            self.started_tracing = False
+
+    # The seconds and calls of each phase over all the days so far
+    def totals(self):
+        totals = {}
+        for day in self.days:
+            for phase, values in day["phases"].items():
+                total = totals.setdefault(phase, {"seconds": 0.0, "calls": 0})
+                total["seconds"] += values["seconds"]
+                total["calls"] += values["calls"]
+        return totals
+
+    # Everything recorded, ready to be saved as JSON
+    def report(self):
+        return {"engine": self.region.engine, "settings": self.region.params.as_dict(),
+                "days": self.days, "totals": self.totals()}
+
+    def save(self, path):
+        with open(path, "w") as report_file:
+            json.dump(self.report(), report_file, indent=1)
+
+    # Prints the totals, the slowest phase first
+    def print_totals(self):
+        totals = self.totals()
+        overall = sum(total["seconds"] for total in totals.values()) or 1
+        for phase, total in sorted(totals.items(), key=lambda item: -item[1]["seconds"]):
+            print("{:>20}: {:0.3f}s ({:0.1f}%) in {} calls".format(
+                phase, total["seconds"], total["seconds"] / overall * 100, total["calls"]))
+
+# What benchmarkSuite runs by default: a small and a medium grid, sparse and
+# crowded, with a slow and a fast spreading virus
+BENCHMARK_SIZES = [(40, 30), (200, 150)]
+BENCHMARK_DENSITIES = [.5, .9]
+BENCHMARK_CONTAGION = [.05, .3]
+
+# Times each of engines on every combination of sizes ((width, height)),
+# densities and contagion factors, all with the same seed: days days of
+# step() (update_grid plus the counting), then a whole update_loop of a
+# fresh region.  With profile on, the same days are run again with a
+# PhaseProfiler and each case gets its phase totals.  Returns a record per
+# case, and if path is given saves them as JSON for compareBenchmarks.
+def benchmarkSuite(engines=("object", "vector"), sizes=None, densities=None, contagion_factors=None,
+                   days=5, seed=0, profile=False, path=None):
+    results = []
+    for engine in engines:
+        for width, height in sizes or BENCHMARK_SIZES:
+            for density in densities or BENCHMARK_DENSITIES:
+                for contagion in contagion_factors or BENCHMARK_CONTAGION:
+                    params = Parameters(width=width, height=height, population_density=density,
+                                        contagion_factor=contagion)
+                    region = createRegion(False, params, seed, engine, False)
+                    start = time.perf_counter()
+                    for day in range(days):
+                        region.step()
+                    seconds_per_day = (time.perf_counter() - start) / days
+                    if hasattr(region, "close"):
+                        region.close()
+
+                    # (Profiling slows it down, so it gets a run of its own)
+                    profiler = None
+                    if profile:
+                        region = createRegion(False, params, seed, engine, False)
+                        profiler = PhaseProfiler(region)
+                        for day in range(days):
+                            region.step()
+                        profiler.detach()
+                        if hasattr(region, "close"):
+                            region.close()
+
+                    region = createRegion(False, params, seed, engine, False)
+                    start = time.perf_counter()
+                    region.update_loop(False)
+                    loop_seconds = time.perf_counter() - start
+                    if hasattr(region, "close"):
+                        region.close()
+
+                    result = {"engine": engine, "width": width, "height": height,
+                              "population_density": density, "contagion_factor": contagion, "seed": seed,
+                              "seconds_per_day": seconds_per_day,
+                              "cells_per_second": width * height / seconds_per_day,
+                              "loop_days": region.clock, "loop_seconds": loop_seconds}
+                    if profiler is not None:
+                        result["phases"] = profiler.totals()
+                    print("{} {}x{} density {} contagion {}: {:0.4f}s per day, whole run {:0.3f}s ({} days)".format(
+                        engine, width, height, density, contagion, seconds_per_day, loop_seconds, region.clock))
+                    results.append(result)
+    if path is not None:
+        with open(path, "w") as results_file:
+            json.dump({"when": time.strftime("%Y-%m-%d %H:%M:%S"), "numpy": np.__version__,
+                       "results": results}, results_file, indent=1)
+    return results
+
+# Compares two files saved by benchmarkSuite, and prints (and returns) the
+# cases that got more than tolerance (a fraction) slower from before to
+# after, per day or for the whole run.
+def compareBenchmarks(before_path, after_path, tolerance=.1):
+    def cases(path):
+        with open(path) as results_file:
+            results = json.load(results_file)["results"]
+        return {(result["engine"], result["width"], result["height"], result["population_density"],
+                 result["contagion_factor"], result["seed"]): result for result in results}
+    before = cases(before_path)
+    after = cases(after_path)
+    slower = []
+    for case in sorted(set(before) & set(after)):
+        for measure in ["seconds_per_day", "loop_seconds"]:
+            ratio = after[case][measure] / before[case][measure]
+            if ratio > 1 + tolerance:
+                print("{} {}x{} density {} contagion {} seed {}: {} went from {:0.4f} to {:0.4f} ({:0.0f}% slower)".format(
+                    *case, measure, before[case][measure], after[case][measure], (ratio - 1) * 100))
+                slower.append({"case": case, "measure": measure, "before": before[case][measure],
+                               "after": after[case][measure]})
+    if not slower:
+        print("Nothing got more than {:0.0f}% slower".format(tolerance * 100))
+    return slower
 
 #Function to construct the graph
 def constructGraph():
+    import matplotlib.pyplot as plt
     plt.title("SIRD graph")
     plt.xlabel("Days")
     plt.ylabel("No. people")
     plt.show()
-    
-# Create the region (call its init method), which will also create
-# the list of Person objects.
-            
-n = Region()
 
-# Call the update_loop function for the first time, which will then take care 
-# of scheduling the next update call.
+# Runs a pandemic and yields each day's DayStats as it happens, without
+# keeping any history, so callers can stream them out or stop early (by
+# just not asking for more).  It stops by itself once nobody is contagious
+# any more, or after max_days days.
+def simulate(params=None, seed=None, engine=None, frontier=None, max_days=None):
+    region = createRegion(False, params, seed, engine, frontier)
+    try:
+        while True:
+            dict_count = region.step()
+            yield region.stats
+            if not region.is_spreading(dict_count) or (max_days is not None and region.clock >= max_days):
+                break
+        region.finish(dict_count)
+    finally:
+        if hasattr(region, "close"):
+            region.close()
 
-n.update_loop()
+# The visual run followed by the SIRD graph and (if study) the parameter
+# study.  Runs on params (or the settings at the top of the file).
+def visualRun(params=None, seed=None, engine=None, frontier=None, study=True):
+    import tkinter
 
-#Call to construct the graph after simulation
+    if BACKGROUND:
+        # The simulation runs in its own process and the window just shows
+        # its days as they come, until nobody is contagious any more.
+        recorder = BackgroundRun(params, seed, engine, frontier).run()
+    else:
+        # Create the region (call its init method), which will also create
+        # the list of Person objects, and the window to watch it in.
+        n = createRegion(False, params, seed, engine, frontier)
+        view = createView(n)
+        n.add_observer(view)
+        recorder = TimeSeriesRecorder()
+        n.add_observer(recorder)
 
-constructGraph()
+        # Let the window run the simulation day by day, a few days per frame,
+        # until nobody is contagious any more.  Then leave the window's
+        # mainloop so that the graph and the study can go next.
+        driver = SimulationDriver(n, report=True, on_finish=[lambda driver: view.master.quit()])
+        driver.run_in_window(view.master)
+        view.master.mainloop()
 
-#Call for parameter study
+    #Call to construct the graph after simulation
+    recorder.plot()
+    constructGraph()
 
-studyParameter()
+    #Call for parameter study
+    if study:
+        studyParameter()
 
-# This line asks the Window to enter a "waiting loop", which will wait until 
-# you close the application window, allowing on-screen updates to keep 
-# occuring until you do.  Without this, the window would update the first
-# time, and then exit the program.
-tkinter.mainloop()
+    # This line asks the Window to enter a "waiting loop", which will wait until 
+    # you close the application window, allowing on-screen updates to keep 
+    # occuring until you do.  Without this, the window would update the first
+    # time, and then exit the program.
+    tkinter.mainloop()
 
-    
-    
+# The command line options for each of Parameters' settings, e.g.
+# --population-density.  With many, each can be given several values (for
+# sweep).
+def addParameterOptions(parser, many=False):
+    for name in Parameters.names:
+        kind = int if name in ["width", "height", "starting_infected", "infection_length"] else float
+        parser.add_argument("--" + name.replace("_", "-"), type=kind, nargs="+" if many else None,
+                            help="default {}".format(globals()[name.upper()]))
+
+def parseArguments(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description="Pandemic simulation.  With no command, does the visual run, "
+                                                 "the SIRD graph and the parameter study.")
+    commands = parser.add_subparsers(dest="command")
+
+    run = commands.add_parser("run", help="one run, printing each day as CSV (or watching it with --visual)")
+    addParameterOptions(run)
+    run.add_argument("--seed", type=int)
+    run.add_argument("--engine", choices=["object", "vector", "tiled", "chunked"])
+    run.add_argument("--frontier", action=argparse.BooleanOptionalAction)
+    run.add_argument("--days", type=int, help="stop after this many days")
+    run.add_argument("--visual", action="store_true", help="show the window and the SIRD graph")
+
+    sweep = commands.add_parser("sweep", help="runs every combination of the values given, "
+                                              "printing a JSON summary per combination")
+    addParameterOptions(sweep, many=True)
+    sweep.add_argument("--replicas", type=int, default=5)
+    sweep.add_argument("--results", help="file to keep finished runs in, so an interrupted sweep can carry on")
+    sweep.add_argument("--workers", type=int)
+    sweep.add_argument("--engine", choices=["object", "vector", "tiled", "chunked", "ensemble"])
+    sweep.add_argument("--seed", type=int, default=0)
+
+    benchmark = commands.add_parser("benchmark", help="times the engines")
+    benchmark.add_argument("which", nargs="?", default="suite", choices=["suite", "scaling", "ensemble", "movement"])
+    benchmark.add_argument("--engines", nargs="+", default=["object", "vector"], help="for suite")
+    benchmark.add_argument("--days", type=int, default=5, help="for suite")
+    benchmark.add_argument("--profile", action="store_true", help="for suite: time each phase too")
+    benchmark.add_argument("--output", help="for suite: save the results as JSON")
+    args = parser.parse_args(argv)
+    if args.command == "run" and (args.engine or ENGINE) == "tiled" and args.frontier:
+        parser.error("--frontier doesn't work with --engine tiled")
+    return args
+
+# The settings given on the command line, as Parameters keyword arguments
+def givenSettings(args):
+    return {name: getattr(args, name) for name in Parameters.names if getattr(args, name) is not None}
+
+# The command line entry point (see parseArguments).  Only happens when this
+# file is run as a program, so importing it (for batch runs) has no side
+# effects.
+def main(argv=None):
+    args = parseArguments(argv)
+    if args.command is None:
+        visualRun()
+    elif args.command == "run":
+        params = Parameters(**givenSettings(args))
+        if args.visual:
+            visualRun(params, args.seed, args.engine, args.frontier, study=False)
+            return
+        print(",".join(DayStats._fields))
+        stats = None
+        for stats in simulate(params, args.seed, args.engine, args.frontier, args.days):
+            print(",".join(str(value) for value in stats), flush=True)
+        if stats is not None:
+            total_people = max(stats.susceptible + stats.infected + stats.symptomatic + stats.recovered + stats.dead, 1)
+            print("The max number of symptomatics at one time was {} people, {:0.2f}% recovered and {:0.2f}% died".format(
+                stats.peak_symptomatic, stats.recovered / total_people * 100, stats.dead / total_people * 100),
+                file=sys.stderr)
+    elif args.command == "sweep":
+        settings = givenSettings(args)
+        points = [dict(zip(settings, values)) for values in itertools.product(*settings.values())]
+        for summary in sweep(points, args.replicas, args.results, args.workers, args.engine, args.seed):
+            print(json.dumps(summary), flush=True)
+    elif args.which == "suite":
+        benchmarkSuite(args.engines, days=args.days, profile=args.profile, path=args.output)
+    elif args.which == "scaling":
+        benchmarkScaling()
+    elif args.which == "ensemble":
+        benchmarkEnsemble()
+    else:
+        benchmarkMovement()
+
+if __name__ == "__main__":
+    main()
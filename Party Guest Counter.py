@@ -1,88 +1,240 @@
 # Tkinter Party Guest App
 # Author: Boris Le
 # Date: 12/2/2021
+# With several doors, run one counting server and a window at each door:
+#   python "Party Guest Counter.py" server --listen 0.0.0.0:8765
+#   python "Party Guest Counter.py" --connect server-address:8765
+# (or a Unix socket, e.g. --listen unix:/tmp/guests.sock).  Without
+# --connect, the window counts on its own like it always has.
 import tkinter
 from tkinter import messagebox
 import random
-main_window = tkinter.Tk()
+import argparse
+import asyncio
+import socket
+import statistics
+import threading
+import time
+
+DEFAULT_ADDRESS = "127.0.0.1:8765"
+BROADCAST_INTERVAL = .02    # Seconds between the server's pushes of the total
+                            # to the windows.  Every tap in between is added up
+                            # into one push.
+LABEL_REFRESH_MS = 50       # How often the window's count can be redrawn, so
+                            # a burst of taps doesn't redraw it every time
+MAX_BACKLOG = 65536         # Bytes of pushes the server lets pile up for a
+                            # client that isn't reading them before it hangs
+                            # up on it
+PONG_TIMEOUT = 10.0         # Seconds the load test waits for its last pings
+                            # to come back before counting them as lost
+
 guestCount = 0
+# The connection to the counting server, or None when counting on our own
+connection = None
+
+
+#Counting server
+
+# Keeps the total for every door.  Each client sends one event per line:
+# a change of "+1", "+5" or "-1" (the window's buttons), or "clear";
+# anything else is ignored.  The total is pushed to
+# every client as "count N" when they connect and then at most every
+# BROADCAST_INTERVAL seconds while it keeps changing.  A client that falls
+# more than MAX_BACKLOG behind on reading the pushes is disconnected.  "ping TOKEN" is
+# answered with "pong TOKEN" along with the next push, once everything sent
+# before it has been counted (that's how the load test measures latency).
+class CountingServer:
+    changes = {b"+1": 1, b"+5": 5, b"-1": -1}
+
+    def __init__(self):
+        self.count = 0
+        self.events = 0
+        self.clients = set()
+        self.pongs = []
+        self.changed = asyncio.Event()
+
+    async def handle(self, reader, writer):
+        self.clients.add(writer)
+        writer.write(b"count %d\n" % self.count)
+        pending = b""
+        try:
+            while True:
+                # Take whatever has arrived, however many events that is,
+                # rather than a line at a time
+                data = await reader.read(65536)
+                if not data:
+                    break
+                lines = (pending + data).split(b"\n")
+                pending = lines.pop()
+                for line in lines:
+                    self.apply(line.strip(), writer)
+                self.changed.set()
+        except ConnectionError:
+            pass
+        finally:
+            self.clients.discard(writer)
+            writer.close()
+
+    def apply(self, line, writer):
+        if line == b"clear":
+            self.count = 0
+        elif line.startswith(b"ping "):
+            self.pongs.append((writer, line[5:]))
+            return
+        elif line in self.changes:
+            self.count += self.changes[line]
+        else:
+            return
+        self.events += 1
+
+    # Pushes the total to everybody whenever it has changed, then waits a
+    # bit so that the next lot of taps goes out together
+    async def broadcast(self):
+        while True:
+            await self.changed.wait()
+            self.changed.clear()
+            message = b"count %d\n" % self.count
+            for writer in list(self.clients):
+                if writer.transport.get_write_buffer_size() > MAX_BACKLOG:
+                    self.clients.discard(writer)
+                    writer.close()
+                else:
+                    writer.write(message)
+            for writer, token in self.pongs:
+                if not writer.is_closing():
+                    writer.write(b"pong " + token + b"\n")
+            self.pongs = []
+            await asyncio.sleep(BROADCAST_INTERVAL)
+
+# "unix:PATH" for a Unix socket, otherwise "HOST:PORT"
+def parseAddress(address):
+    if address.startswith("unix:"):
+        return "unix", address[5:]
+    host, _, port = address.rpartition(":")
+    return "tcp", (host or "127.0.0.1", int(port))
+
+# Starts a CountingServer listening on address (in the running event loop).
+# Returns the server and the asyncio server, whose sockets say which port
+# it got if the port was 0.
+async def startServer(address):
+    server = CountingServer()
+    kind, where = parseAddress(address)
+    if kind == "unix":
+        listener = await asyncio.start_unix_server(server.handle, where)
+    else:
+        listener = await asyncio.start_server(server.handle, where[0], where[1])
+    server.pusher = asyncio.ensure_future(server.broadcast())
+    return server, listener
+
+def runServer(address):
+    async def serve():
+        server, listener = await startServer(address)
+        print("Counting guests on", address)
+        async with listener:
+            await listener.serve_forever()
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+
+async def openConnection(address):
+    kind, where = parseAddress(address)
+    if kind == "unix":
+        return await asyncio.open_unix_connection(where)
+    return await asyncio.open_connection(where[0], where[1])
+
+
+#Connection from a window to the server
+
+# Sends this door's taps to the server, and keeps the latest total it
+# pushes back.  The pushes are read in a thread of their own; the window
+# only ever looks at count (see refresh_label), since tkinter can only be
+# used from the main thread.
+class ServerConnection:
+    def __init__(self, address):
+        kind, where = parseAddress(address)
+        if kind == "unix":
+            self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self.sock.connect(where)
+        else:
+            self.sock = socket.create_connection(where)
+        self.count = 0
+        self.connected = True
+        threading.Thread(target=self.listen, daemon=True).start()
+
+    # Sends one event.  Once the server is gone the event is dropped (the
+    # window's title says so, see refresh_label), since it's called from
+    # the buttons and keys and there's nobody to count it.
+    def send(self, event):
+        if not self.connected:
+            return
+        try:
+            self.sock.sendall(event.encode() + b"\n")
+        except OSError:
+            self.connected = False
+
+    def listen(self):
+        try:
+            for line in self.sock.makefile("rb"):
+                if line.startswith(b"count "):
+                    self.count = int(line[6:])
+        except OSError:
+            pass
+        self.connected = False
+
+
+#Function to change the count by change guests, here or on the server
+def add_guests(change):
+    global guestCount
+
+    if connection is not None:
+        connection.send("{:+d}".format(change))
+    else:
+        guestCount += change
 
 #Function to count one guest
 def count_one_guest():
-    global guestCount
-    global output_field
-    
-    guestCount += 1
-    output_field.config(text=guestCount)
-    
+    add_guests(1)
+
 #Function to count five guest
 def count_five_guest():
-    global guestCount
-    global output_field
-    
-    guestCount += 5
-    output_field.config(text=guestCount)
+    add_guests(5)
 
 #Function to decrease by one guest
 def decrement_one_guest():
-    global guestCount
-    global output_field
-    
-    guestCount -= 1
-    output_field.config(text=guestCount)
-  
-#Function to clear Guests  
+    add_guests(-1)
+
+#Function to clear Guests
 def clearGuests():
     global guestCount
-    global output_field
-    
+
     if tkinter.messagebox.askyesno(title="Guest Counter", message="Are you sure you want to clear?"):
-        guestCount = 0
+        if connection is not None:
+            connection.send("clear")
+        else:
+            guestCount = 0
+
+#Redraw the count, if it has changed, every LABEL_REFRESH_MS.  The buttons
+#and keys only change the count, so however fast they come the label is
+#redrawn at most this often.
+def refresh_label():
+    global guestCount
+
+    if connection is not None:
+        guestCount = connection.count
+        if not connection.connected:
+            main_window.title("Party Guest Counter (lost the server)")
+    if output_field.cget("text") != str(guestCount):
         output_field.config(text=guestCount)
+    main_window.after(LABEL_REFRESH_MS, refresh_label)
 
-#Generate random number and display messagebox if winner        
+#Generate random number and display messagebox if winner
 def wonPrize():
     N = int(spin_box.get())
     rand_int = random.randrange(1,N+1)
-    
+
     if rand_int == N:
         tkinter.messagebox.showinfo("Prize Winner", "You won a prize!")
-        
-
-#Tkinter GUI design
-
-main_window.title("Party Guest Counter")
-main_window.geometry('400x300')
-
-frame = tkinter.Frame(main_window)
-frame.grid()
-
-spin_box = tkinter.Spinbox(
-    from_=1,
-    to=100,
-    wrap=True)
-spin_box.grid(row=5, column=0, columnspan=2)
-
-output_label = tkinter.Label(frame, text="Guest count: ", font=('sans-serif', 18, 'bold'))
-output_label.grid(row=0, column=1)
-
-output_field = tkinter.Label(frame, text=guestCount, font=('sans-serif', 18, 'bold'))
-output_field.grid(row=0, column=2)
-
-plus_one = tkinter.Button(frame, text="+1", command=count_one_guest)
-plus_one.grid(row=1, column=0, columnspan=2)
-
-plus_five = tkinter.Button(frame, text="+5", command=count_five_guest)
-plus_five.grid(row=2, column=0, columnspan=2)
-
-minus_one = tkinter.Button(frame, text="-1", command=decrement_one_guest)
-minus_one.grid(row=3, column=0, columnspan=2)
-
-clear_guests = tkinter.Button(frame, text="Clear Guests", command=clearGuests)
-clear_guests.grid(row=4, column=0, columnspan=2)
-
-rollPrize = tkinter.Button(frame, text="Roll For Prize", command=wonPrize)
-rollPrize.grid(row=5, column=0, columnspan=2)
 
 
 #Associated functions with keys
@@ -97,11 +249,181 @@ def keyPressed(event):
     elif event.keysym == "b": #Increase by five if b is pressed
         count_five_guest()
 
-#Bind keys
 
-frame.bind_all("a", keyPressed)
-frame.bind_all("b", keyPressed)
-frame.bind_all("<Return>", keyPressed)
-frame.bind_all("<space>", keyPressed)
+#Tkinter GUI design, counting on the server at address if given
+
+def runWindow(address=None):
+    global main_window
+    global output_field
+    global spin_box
+    global connection
+
+    if address is not None:
+        connection = ServerConnection(address)
+
+    main_window = tkinter.Tk()
+    main_window.title("Party Guest Counter")
+    main_window.geometry('400x300')
+
+    frame = tkinter.Frame(main_window)
+    frame.grid()
+
+    spin_box = tkinter.Spinbox(
+        from_=1,
+        to=100,
+        wrap=True)
+    spin_box.grid(row=5, column=0, columnspan=2)
+
+    output_label = tkinter.Label(frame, text="Guest count: ", font=('sans-serif', 18, 'bold'))
+    output_label.grid(row=0, column=1)
+
+    output_field = tkinter.Label(frame, text=guestCount, font=('sans-serif', 18, 'bold'))
+    output_field.grid(row=0, column=2)
+
+    plus_one = tkinter.Button(frame, text="+1", command=count_one_guest)
+    plus_one.grid(row=1, column=0, columnspan=2)
+
+    plus_five = tkinter.Button(frame, text="+5", command=count_five_guest)
+    plus_five.grid(row=2, column=0, columnspan=2)
+
+    minus_one = tkinter.Button(frame, text="-1", command=decrement_one_guest)
+    minus_one.grid(row=3, column=0, columnspan=2)
+
+    clear_guests = tkinter.Button(frame, text="Clear Guests", command=clearGuests)
+    clear_guests.grid(row=4, column=0, columnspan=2)
+
+    rollPrize = tkinter.Button(frame, text="Roll For Prize", command=wonPrize)
+    rollPrize.grid(row=5, column=0, columnspan=2)
+
+    #Bind keys
+
+    frame.bind_all("a", keyPressed)
+    frame.bind_all("b", keyPressed)
+    frame.bind_all("<Return>", keyPressed)
+    frame.bind_all("<space>", keyPressed)
+
+    refresh_label()
+    frame.mainloop()
+
+
+#Load test
+
+# Stands in for a busy party: clients connections tap +1 for seconds
+# seconds, as fast as they can or rate taps per second between them, while
+# another one pings every 10 ms to measure how long an event takes to come
+# back in a push (end-to-end latency).  Flat out, that's mostly how long
+# the taps queue up waiting for the server.  Prints the events per second,
+# counted until the server's total has caught up with every tap, the
+# latency, and how many pings never came back (within PONG_TIMEOUT of the
+# end).  Without an address it starts its own server to test against.
+# Against a real server, nobody else should be counting at the same time.
+async def loadTest(address=None, clients=8, seconds=3.0, rate=None):
+    server = None
+    if address is None:
+        server, listener = await startServer("127.0.0.1:0")
+        address = "127.0.0.1:{}".format(listener.sockets[0].getsockname()[1])
+
+    # A connection that watches the pushed total
+    watch_reader, watch_writer = await openConnection(address)
+    start_count = int((await watch_reader.readline()).split()[1])
+    latest = [start_count]
+    async def watch():
+        while True:
+            line = await watch_reader.readline()
+            if not line:
+                break
+            latest[0] = int(line.split()[1])
+    watcher = asyncio.ensure_future(watch())
+
+    deadline = time.perf_counter() + seconds
+    sent = [0] * clients
+    async def tap(client):
+        reader, writer = await openConnection(address)
+        next_batch = time.perf_counter()
+        while time.perf_counter() < deadline:
+            writer.write(b"+1\n" * 100)
+            await writer.drain()
+            sent[client] += 100
+            if rate:
+                next_batch += 100 * clients / rate
+                await asyncio.sleep(max(0, next_batch - time.perf_counter()))
+        return writer
+
+    latencies = []
+    lost = [0]
+    async def probe():
+        reader, writer = await openConnection(address)
+        waiting = {}
+        async def pongs():
+            while waiting or time.perf_counter() < deadline:
+                line = await reader.readline()
+                if not line:
+                    break
+                if line.startswith(b"pong "):
+                    latencies.append(time.perf_counter() - waiting.pop(line[5:].strip()))
+        reading = asyncio.ensure_future(pongs())
+        number = 0
+        while time.perf_counter() < deadline:
+            token = str(number).encode()
+            waiting[token] = time.perf_counter()
+            writer.write(b"ping " + token + b"\n")
+            number += 1
+            await asyncio.sleep(.01)
+        # Wait for every ping still out to come back, or give up on them
+        try:
+            if waiting:
+                await asyncio.wait_for(reading, PONG_TIMEOUT)
+        except asyncio.TimeoutError:
+            pass
+        reading.cancel()
+        lost[0] = len(waiting)
+        writer.close()
+
+    start = time.perf_counter()
+    tappers = asyncio.gather(*[tap(client) for client in range(clients)])
+    await probe()
+    writers = await tappers
+    while latest[0] < start_count + sum(sent):
+        await asyncio.sleep(.001)
+    elapsed = time.perf_counter() - start
+    watcher.cancel()
+    for writer in writers + [watch_writer]:
+        writer.close()
+    if server is not None:
+        # Let the server see everybody go before stopping it
+        while server.clients:
+            await asyncio.sleep(.01)
+        server.pusher.cancel()
+        listener.close()
+        await listener.wait_closed()
+
+    print("{} events from {} clients in {:0.2f}s: {:0.0f} events per second".format(
+        sum(sent), clients, elapsed, sum(sent) / elapsed))
+    if latencies:
+        latencies.sort()
+        print("Latency: median {:0.1f} ms, 99th percentile {:0.1f} ms, worst {:0.1f} ms".format(
+            statistics.median(latencies) * 1000, latencies[int(len(latencies) * .99)] * 1000, latencies[-1] * 1000))
+    if lost[0]:
+        print("{} of {} pings never came back".format(lost[0], lost[0] + len(latencies)))
+    return sum(sent) / elapsed, latencies
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Party guest counter")
+    parser.add_argument("--connect", help="count on the server at HOST:PORT or unix:PATH")
+    modes = parser.add_subparsers(dest="mode")
+    server_mode = modes.add_parser("server", help="run the counting server")
+    server_mode.add_argument("--listen", default=DEFAULT_ADDRESS, help="HOST:PORT or unix:PATH")
+    load_mode = modes.add_parser("loadtest", help="measure events per second and latency")
+    load_mode.add_argument("--connect", dest="load_address", help="server to test (default: a local one)")
+    load_mode.add_argument("--clients", type=int, default=8)
+    load_mode.add_argument("--seconds", type=float, default=3.0)
+    load_mode.add_argument("--rate", type=float, help="taps per second (default: as fast as possible)")
+    args = parser.parse_args()
 
-frame.mainloop()
\ No newline at end of file
+    if args.mode == "server":
+        runServer(args.listen)
+    elif args.mode == "loadtest":
+        asyncio.run(loadTest(args.load_address, args.clients, args.seconds, args.rate))
+    else:
+        runWindow(args.connect)